@@ -4,6 +4,8 @@ from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.responses import JSONResponse, PlainTextResponse
 from typing import List, Optional
 from pathlib import Path
+import asyncio
+import os
 import shutil
 import json
 
@@ -16,6 +18,7 @@ from llm.case_builder import run_case_builder
 from llm.severity import run_severity
 from llm.scorer import run_score
 from reports.report_generator import run_report
+from utils.io import read_json_utf8
 from pathlib import Path
 
 app = FastAPI(title="MedLegal API", version="0.1.0")
@@ -28,6 +31,26 @@ def _input_dir_for_claim(claim_id: str) -> Path:
 def health():
     return {"ok": True}
 
+def _save_upload(src, dst: Path) -> None:
+    """
+    Copy an UploadFile's underlying file to dst without round-tripping bytes
+    through the Python heap. Starlette spools uploads >1 MiB to a real temp
+    file; when we have a real fd, let the kernel move the bytes with
+    os.copy_file_range. Otherwise fall back to shutil.copyfileobj.
+    """
+    src.seek(0)
+    with open(dst, "wb") as out:
+        # _rolled: SpooledTemporaryFile already on disk (plain files count too)
+        if getattr(src, "_rolled", True) and hasattr(os, "copy_file_range"):
+            try:
+                src_fd = src.fileno()
+                while os.copy_file_range(src_fd, out.fileno(), 1 << 24):
+                    pass
+                return
+            except (AttributeError, OSError, ValueError):
+                src.seek(0)  # e.g. cross-device or unsupported fs; copy manually
+        shutil.copyfileobj(src, out, 1 << 20)
+
 @app.post("/claims/{claim_id}/ingest")
 async def ingest_claim(claim_id: str, files: list[UploadFile] = File(...)):
     in_dir = _input_dir_for_claim(claim_id)
@@ -36,54 +59,61 @@ async def ingest_claim(claim_id: str, files: list[UploadFile] = File(...)):
         if not f.filename.lower().endswith(".pdf"):
             raise HTTPException(400, f"Only PDF allowed: {f.filename}")
         dst = in_dir / f.filename
-        with dst.open("wb") as out:
-            out.write(await f.read())
+        # Starlette already spooled the body; move it at C/kernel speed
+        await asyncio.to_thread(_save_upload, f.file, dst)
         saved.append(dst.name)
     return {"claim_id": claim_id, "saved": saved, "input_dir": str(in_dir)}
 
 
 @app.post("/claims/{claim_id}/adjudicate")
-def adjudicate(claim_id: str, workers: int = 6, build_index: bool = True):
+async def adjudicate(claim_id: str, workers: int = 6, build_index: bool = True):
     p = paths_for_claim(claim_id)
 
+    # Pipeline stages are blocking (DocAI RPCs, Gemini, disk); run them in
+    # worker threads so the event loop stays free for concurrent claims.
+
     # 1) split → pages must exist
-    run_split(claim_id)
-    pages = list(p.pages.glob("*.pdf"))
+    await asyncio.to_thread(run_split, claim_id)
+    pages = await asyncio.to_thread(lambda: list(p.pages.glob("*.pdf")))
     if not pages:
         raise HTTPException(400, f"No single-page PDFs in {p.pages}. Did you upload & split?")
 
-    # 2) classify (idempotent)
-    run_classify(claim_id, max_workers=workers)
+    # 2) classify (idempotent; fans DocAI calls out over `workers` threads)
+    await asyncio.to_thread(run_classify, claim_id, workers)
 
     # 3) collect text (idempotent)
-    run_collect_text(claim_id)
+    await asyncio.to_thread(run_collect_text, claim_id)
 
-    # 4) index (optional)
+    # 4+5) index and case builder both consume ALL.txt and are independent
+    # of each other, so overlap the FTS build with the Gemini call
     if build_index:
-        build_chunks_and_index(claim_id)
-
-    # 5) LLMs
-    run_case_builder(claim_id)
+        await asyncio.gather(
+            asyncio.to_thread(build_chunks_and_index, claim_id),
+            asyncio.to_thread(run_case_builder, claim_id),
+        )
+    else:
+        await asyncio.to_thread(run_case_builder, claim_id)
 
     # Severity + Score + Report: keep going even if one has issues
+    # (run_severity drives its own asyncio.run, so keep it in a thread)
     try:
-        run_severity(claim_id)
+        await asyncio.to_thread(run_severity, claim_id)
     except Exception as e:
         # Last-ditch: create default severity so scorer & report can proceed
         from utils.io import write_json_utf8
         p2 = paths_for_claim(claim_id)
-        case = json.loads((p2.reports_dir / "case.json").read_text(encoding="utf-8"))
+        case = read_json_utf8(p2.reports_dir / "case.json")
         defaults = {f["id"]: {"multiplier": 1.0, "reason": "default 1.0"} for f in (case.get("flags") or [])}
         write_json_utf8(p2.reports_dir / "severity.json", defaults)
 
     try:
-        run_score(claim_id)
+        await asyncio.to_thread(run_score, claim_id)
     except Exception:
         # If this ever fails, there is nothing else to compute; re-raise
         raise
 
     try:
-        run_report(claim_id)
+        await asyncio.to_thread(run_report, claim_id)
     except Exception:
         # Report is just a view over JSON; don't kill the endpoint if it fails
         pass
@@ -99,7 +129,7 @@ def adjudicate(claim_id: str, workers: int = 6, build_index: bool = True):
         if not pth.exists():
             raise HTTPException(500, f"{label} not produced at {pth}")
 
-    confidence = json.loads(scoring_path.read_text(encoding="utf-8")).get("confidence", 0.5)
+    confidence = read_json_utf8(scoring_path).get("confidence", 0.5)
     return JSONResponse({
         "claim_id": claim_id,
         "confidence": confidence,
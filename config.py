@@ -2,6 +2,7 @@
 from __future__ import annotations
 import os
 from dataclasses import dataclass
+from functools import cached_property, lru_cache
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -83,14 +84,14 @@ class ClaimPaths:
     def samples_root(self) -> Path:
         return SAMPLES_ROOT
 
-    @property
+    @cached_property
     def input_docs(self) -> Path:
         """samples/input_docs/<claim_id>"""
         p = INPUT_ROOT / self.claim_id
         p.mkdir(parents=True, exist_ok=True)
         return p
 
-    @property
+    @cached_property
     def processed_root(self) -> Path:
         """samples/processed/<claim_id>"""
         p = PROC_ROOT / self.claim_id
@@ -104,7 +105,7 @@ class ClaimPaths:
         return self.processed_root
 
     # --- subdirs ---
-    @property
+    @cached_property
     def pages(self) -> Path:
         p = self.processed_root / "01_pages"
         p.mkdir(parents=True, exist_ok=True)
@@ -115,19 +116,19 @@ class ClaimPaths:
     def pages_1p(self) -> Path:
         return self.pages
 
-    @property
+    @cached_property
     def classified_pages(self) -> Path:
         p = self.processed_root / "03_classified_pages"
         p.mkdir(parents=True, exist_ok=True)
         return p
 
-    @property
+    @cached_property
     def docai_json(self) -> Path:
         p = self.processed_root / "04_docai_json"
         p.mkdir(parents=True, exist_ok=True)
         return p
 
-    @property
+    @cached_property
     def pandas_out(self) -> Path:
         p = self.processed_root / "06_pandas"
         p.mkdir(parents=True, exist_ok=True)
@@ -138,7 +139,7 @@ class ClaimPaths:
     def pandas(self) -> Path:
         return self.pandas_out
 
-    @property
+    @cached_property
     def text_dir(self) -> Path:
         p = self.processed_root / "07_text"
         p.mkdir(parents=True, exist_ok=True)
@@ -149,7 +150,7 @@ class ClaimPaths:
     def text(self) -> Path:
         return self.text_dir
 
-    @property
+    @cached_property
     def reports_dir(self) -> Path:
         p = self.processed_root / "08_reports"
         p.mkdir(parents=True, exist_ok=True)
@@ -160,15 +161,18 @@ class ClaimPaths:
     def reports(self) -> Path:
         return self.reports_dir
 
-    @property
+    @cached_property
     def index_dir(self) -> Path:
         p = self.processed_root / "index"
         p.mkdir(parents=True, exist_ok=True)
         return p
 
+@lru_cache(maxsize=256)
 def paths_for_claim(claim_id: str) -> ClaimPaths:
     """
-    Single entry-point for consumers. Returns a ClaimPaths that creates dirs lazily.
+    Single entry-point for consumers. Returns a ClaimPaths that creates dirs
+    lazily; cached so every pipeline step shares one instance per claim and
+    each mkdir happens at most once per process.
     """
     # Ensure top-level roots exist (so API endpoints can show them immediately)
     INPUT_ROOT.mkdir(parents=True, exist_ok=True)
@@ -1,14 +1,19 @@
 # medlegal/llm/case_builder.py
 from __future__ import annotations
 from pathlib import Path
-import json, hashlib
+import asyncio, json, hashlib
 from typing import List, Dict
 import google.generativeai as genai
 from config import GEMINI_API_KEY, paths_for_claim
-from utils.io import write_json_utf8
+from utils.io import loads_json, write_json_utf8
+from utils import llm_cache
 
 MIN_FLAGS = 15
 
+# Shared client: one configure + one model per process; per-call
+# construction rebuilt the channel/TLS on every /adjudicate
+genai.configure(api_key=GEMINI_API_KEY)
+
 SYSTEM = """You are an insurance adjudication assistant.
 
 RULES (read carefully):
@@ -57,12 +62,32 @@ Return strictly JSON using this schema:
 }}
 """
 
-def _read_all_text(claim_id: str) -> str:
+MAP_TASK = """From this dossier part ONLY, extract up to 10 candidate flags.
+
+Each candidate MUST have: `title`, `direction` ∈ {support, contradict, neutral},
+`score` ∈ {-2,-1,0,+1,+2}, `citations` like ["Bills#5"], and 1–3 sentence `details`.
+Also include a 2–4 sentence `partial_summary` of what this part shows.
+
+Return strictly JSON: {"partial_summary": "...", "candidates": [ ... ]}
+"""
+
+REDUCE_TASK = """You are given candidate flags and partial summaries extracted from parts of the dossier.
+Merge them: drop duplicates, keep the best-evidenced candidates, and build the final case.
+
+""" + TASK
+
+CASE_MODEL = genai.GenerativeModel(
+    model_name="gemini-2.5-pro",
+    system_instruction=SYSTEM
+)
+
+def _read_all_bytes(claim_id: str) -> bytes:
+    # bytes on purpose: hashed raw for the cache key, decoded exactly once
     p = paths_for_claim(claim_id)
     all_txt = p.text_dir / "ALL.txt"
     if not all_txt.exists():
         raise RuntimeError(f"[case] {all_txt} not found. Run 'collect' first.")
-    return all_txt.read_text(encoding="utf-8")
+    return all_txt.read_bytes()
 
 def _chunk_text(s: str, max_chars: int = 180_000) -> List[str]:
     if len(s) <= max_chars:
@@ -73,48 +98,41 @@ def _chunk_text(s: str, max_chars: int = 180_000) -> List[str]:
         i += max_chars
     return parts
 
-def _normalize_and_pad(payload: Dict) -> Dict:
-    # Ensure flags exist, have ids F1.., proper direction, and at least MIN_FLAGS items
-    flags = payload.get("flags") or []
-    # Fix IDs and directions
-    for idx, fl in enumerate(flags, 1):
-        fl["id"] = fl.get("id") or f"F{idx}"
-        sc = fl.get("score", 0)
-        try:
-            sc = int(sc)
-        except Exception:
-            sc = 0
-        # Derive direction from score if missing/wrong
-        dir_in = (fl.get("direction") or "").lower()
-        if sc > 0:
-            dir_out = "support"
-        elif sc < 0:
-            dir_out = "contradict"
-        else:
-            dir_out = "neutral"
-        if dir_in not in {"support", "contradict", "neutral"}:
-            fl["direction"] = dir_out
-        else:
-            fl["direction"] = dir_in or dir_out
-        # Defensive defaults
-        fl["title"] = fl.get("title") or f"Flag {idx}"
-        fl["citations"] = fl.get("citations") or []
-        fl["details"] = fl.get("details") or "No details provided."
-
-    # Pad to MIN_FLAGS with neutral placeholders if needed
-    n = len(flags)
-    while len(flags) < MIN_FLAGS:
-        k = len(flags) + 1
-        flags.append({
-            "id": f"F{k}",
+def _build_flag(idx: int, src: Dict | None) -> Dict:
+    # One output flag with ids F1.., proper direction and defensive defaults;
+    # src=None yields the neutral placeholder
+    if src is None:
+        return {
+            "id": f"F{idx}",
             "title": "Insufficient evidence",
             "direction": "neutral",
             "score": 0,
             "citations": [],
             "details": "Insufficient dossier evidence to ground this flag."
-        })
+        }
+    try:
+        sc = int(src.get("score", 0))
+    except Exception:
+        sc = 0
+    # Derive direction from score if missing/wrong
+    dir_in = (src.get("direction") or "").lower()
+    if dir_in not in {"support", "contradict", "neutral"}:
+        dir_in = "support" if sc > 0 else ("contradict" if sc < 0 else "neutral")
+    src["id"] = src.get("id") or f"F{idx}"
+    src["direction"] = dir_in
+    src["title"] = src.get("title") or f"Flag {idx}"
+    src["citations"] = src.get("citations") or []
+    src["details"] = src.get("details") or "No details provided."
+    return src
 
-    payload["flags"] = flags[:MIN_FLAGS]
+def _normalize_and_pad(payload: Dict) -> Dict:
+    # Output shape is fixed: exactly MIN_FLAGS items. Fill a pre-sized list
+    # by index instead of fixing up then growing/truncating a variable list.
+    flags = payload.get("flags") or []
+    out: List[Dict] = [None] * MIN_FLAGS  # type: ignore[list-item]
+    for i in range(MIN_FLAGS):
+        out[i] = _build_flag(i + 1, flags[i] if i < len(flags) else None)
+    payload["flags"] = out
     payload["case"] = payload.get("case") or {}
     return payload
 
@@ -123,44 +141,83 @@ def run_case_builder(claim_id: str, temperature: float = 0.2, verbose: bool = Tr
     out_dir = p.reports_dir
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    dossier = _read_all_text(claim_id)
+    raw = _read_all_bytes(claim_id)
+    dossier = raw.decode("utf-8")
     chunks = _chunk_text(dossier)
 
     if verbose:
         print(f"[case] feeding dossier: {sum(len(c) for c in chunks)} chars via {len(chunks)} part(s)")
 
-    genai.configure(api_key=GEMINI_API_KEY)
-    model = genai.GenerativeModel(
-        model_name="gemini-2.5-pro",
-        system_instruction=SYSTEM
-    )
-
-    # Build content parts: label the dossier, then append all text parts, then the task
-    parts: List[str] = [
-        f"CLAIM {claim_id} DOSSIER. Use ONLY this text. Cite evidence as [Category#Page]."
-    ]
-    parts.extend(chunks)
-    parts.append(TASK)
-
-    resp = model.generate_content(
-        parts,
-        generation_config=genai.types.GenerationConfig(
-            temperature=temperature,
-            top_p=0.9,
-            max_output_tokens=8192,
-            response_mime_type="application/json"  # ← force JSON
-        )
-    )
-
-    text = resp.text or "{}"
-    # direct JSON is expected; still guard against wrappers
-    start, end = text.find("{"), text.rfind("}")
-    raw = text[start:end+1] if (start != -1 and end != -1) else "{}"
-
+    # Skip Gemini entirely when we already answered this exact dossier+prompt
+    cache_id = llm_cache.cache_key("case:", SYSTEM, TASK, raw)
+    text = llm_cache.get(claim_id, cache_id)
+    if text is not None and verbose:
+        print("[case] llm cache hit; skipping Gemini")
+
+    if text is None:
+        model = CASE_MODEL
+
+        def _gen_config():
+            return genai.types.GenerationConfig(
+                temperature=temperature,
+                top_p=0.9,
+                max_output_tokens=8192,
+                response_mime_type="application/json"  # ← force JSON
+            )
+
+        if len(chunks) == 1:
+            # Small dossier: single call, as before
+            parts: List[str] = [
+                f"CLAIM {claim_id} DOSSIER. Use ONLY this text. Cite evidence as [Category#Page]."
+            ]
+            parts.extend(chunks)
+            parts.append(TASK)
+            resp = model.generate_content(parts, generation_config=_gen_config())
+            text = resp.text or "{}"
+        else:
+            # Large dossier: map each chunk concurrently to candidate flags,
+            # then one reduce call merges them into the final {case, flags}.
+            async def _map_chunk(idx: int, chunk: str) -> str:
+                resp = await model.generate_content_async(
+                    [
+                        f"CLAIM {claim_id} DOSSIER PART {idx+1}/{len(chunks)}. "
+                        f"Use ONLY this text. Cite evidence as [Category#Page].",
+                        chunk,
+                        MAP_TASK,
+                    ],
+                    generation_config=_gen_config()
+                )
+                return resp.text or "{}"
+
+            async def _map_all() -> List[str]:
+                return await asyncio.gather(*[_map_chunk(i, c) for i, c in enumerate(chunks)])
+
+            if verbose:
+                print(f"[case] map-reduce over {len(chunks)} chunk(s)")
+            map_outputs = asyncio.run(_map_all())
+
+            resp = model.generate_content(
+                [
+                    f"CLAIM {claim_id}: candidate flags extracted per dossier part (JSON, in order).",
+                    "\n".join(map_outputs),
+                    REDUCE_TASK,
+                ],
+                generation_config=_gen_config()
+            )
+            text = resp.text or "{}"
+
+        llm_cache.put(claim_id, cache_id, text)
+
+    # response_mime_type is JSON, so parse the text directly; brace-slice
+    # only as fallback for wrapped or truncated output
     try:
-        payload = json.loads(raw)
+        payload = loads_json(text)
     except Exception:
-        payload = {}
+        start, end = text.find("{"), text.rfind("}")
+        try:
+            payload = json.loads(text[start:end+1]) if (start != -1 and end != -1) else {}
+        except Exception:
+            payload = {}
 
     payload = _normalize_and_pad(payload)
 
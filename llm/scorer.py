@@ -1,9 +1,13 @@
 # medlegal/llm/scorer.py
 from __future__ import annotations
 from pathlib import Path
+from collections import namedtuple
 import json
+import numpy as np
 from config import paths_for_claim
-from utils.io import write_json_utf8
+from utils.io import read_json_utf8, write_json_utf8
+
+Row = namedtuple("Row", "id title direction score multiplier weighted citations")
 
 def run_score(claim_id: str, verbose: bool = True) -> None:
     p = paths_for_claim(claim_id)
@@ -12,7 +16,16 @@ def run_score(claim_id: str, verbose: bool = True) -> None:
     sev_path  = out_dir / "severity.json"
     out_path  = out_dir / "scoring.json"
 
-    case = json.loads(case_path.read_text(encoding="utf-8"))
+    # Idempotent re-runs: if scoring.json is newer than both inputs,
+    # recomputing would rewrite identical output — skip it
+    if out_path.exists() and case_path.exists() and sev_path.exists():
+        newest_in = max(case_path.stat().st_mtime_ns, sev_path.stat().st_mtime_ns)
+        if out_path.stat().st_mtime_ns > newest_in:
+            if verbose:
+                print(f"[score] {out_path} up to date; skipping")
+            return
+
+    case = read_json_utf8(case_path)
 
     # If severity.json is missing or corrupt, synthesize defaults (1.0)
     if not sev_path.exists():
@@ -20,7 +33,7 @@ def run_score(claim_id: str, verbose: bool = True) -> None:
         sev = {f["id"]: {"multiplier": 1.0, "reason": "default 1.0"} for f in flags}
     else:
         try:
-            sev = json.loads(sev_path.read_text(encoding="utf-8"))
+            sev = read_json_utf8(sev_path)
             if not isinstance(sev, dict):
                 raise ValueError("severity.json is not a dict")
         except Exception:
@@ -28,37 +41,36 @@ def run_score(claim_id: str, verbose: bool = True) -> None:
             sev = {f["id"]: {"multiplier": 1.0, "reason": "default 1.0"} for f in flags}
 
     flags = case.get("flags") or []
-    rows  = []
-    total = 0.0
-    max_possible = 0.0
 
+    # Gather scores/multipliers into parallel arrays (SoA), then do the
+    # arithmetic in a single vectorized pass instead of per-flag Python math
+    scores_l, mults_l = [], []
     for f in flags:
-        fid   = f["id"]
         try:
-            score = float(f.get("score", 0))
+            scores_l.append(float(f.get("score", 0)))
         except Exception:
-            score = 0.0
+            scores_l.append(0.0)
         try:
-            mult  = float(sev.get(fid, {}).get("multiplier", 1.0))
+            mults_l.append(float(sev.get(f["id"], {}).get("multiplier", 1.0)))
         except Exception:
-            mult = 1.0
-        mult = max(0.5, min(3.0, mult))
-        w     = score * mult
-        rows.append({
-            "id": fid,
-            "title": f.get("title",""),
-            "direction": f.get("direction",""),
-            "score": score,
-            "multiplier": mult,
-            "weighted": w,
-            "citations": f.get("citations",[])
-        })
-        total += w
-        max_possible += abs(2.0 * mult)  # max magnitude per flag
+            mults_l.append(1.0)
+
+    scores = np.asarray(scores_l, dtype=np.float64)
+    mults  = np.clip(np.asarray(mults_l, dtype=np.float64), 0.5, 3.0)
+    weighted = scores * mults
+
+    # One fixed-shape record per flag; dicts are materialized only at write time
+    rows = [Row(
+        f["id"], f.get("title",""), f.get("direction",""),
+        float(s), float(m), float(w), f.get("citations",[])
+    ) for f, s, m, w in zip(flags, scores, mults, weighted)]
+
+    total = float(weighted.sum())
+    max_possible = float(2.0 * np.abs(mults).sum())  # max magnitude per flag
 
     confidence = (total + max_possible) / (2.0 * max_possible) if max_possible > 0 else 0.5
     out = {
-        "flags": rows,
+        "flags": [r._asdict() for r in rows],
         "sum_weighted": total,
         "max_possible": max_possible,
         "confidence": round(confidence, 4)
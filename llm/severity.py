@@ -1,11 +1,12 @@
 # medlegal/llm/severity.py
 from __future__ import annotations
 from pathlib import Path
-import json, re, traceback
+import asyncio, json, os, re, traceback
 from typing import Dict, List
 import google.generativeai as genai
 from config import GEMINI_API_KEY, paths_for_claim
-from utils.io import write_json_utf8, write_text_utf8
+from utils.io import loads_json, read_json_utf8, write_json_utf8, write_text_utf8
+from utils import llm_cache
 
 # Keep reasons short to reduce output size and avoid truncation
 PROMPT = """You will receive:
@@ -25,35 +26,59 @@ Rules:
 
 BATCH_SIZE = 8  # keep small to avoid long outputs per call
 MAX_OUTPUT_TOKENS = 2048  # fits ~8 items w/ short reasons
+MAX_CONCURRENCY = 8  # cap parallel Gemini calls (provider QPM)
+
+# Raw-response dumps are debugging aids; don't pay per-batch file appends
+# for them unless explicitly asked
+DEBUG_LLM = os.environ.get("MEDLEGAL_DEBUG_LLM") == "1"
+
+# Shared client: configure once at import and reuse the model (and its
+# underlying channel) across requests instead of rebuilding per call
+genai.configure(api_key=GEMINI_API_KEY)
+SEV_MODEL = genai.GenerativeModel(model_name="gemini-2.5-pro")
+
+# Precompiled: these run on every batch response
+_FENCE_HEAD = re.compile(r"^```(?:json)?\s*", re.IGNORECASE)
+_FENCE_TAIL = re.compile(r"\s*```$")
+_TRAIL_OBJ  = re.compile(r",\s*}")
+_TRAIL_ARR  = re.compile(r",\s*]")
+_BRACE      = re.compile(r"[{}]")
 
 def _shorten_reason(s: str, max_words: int = 12) -> str:
     parts = (s or "").split()
     return " ".join(parts[:max_words])
 
 def _strip_code_fences(s: str) -> str:
-    s = re.sub(r"^```(?:json)?\s*", "", (s or "").strip(), flags=re.IGNORECASE)
-    s = re.sub(r"\s*```$", "", s.strip())
+    s = _FENCE_HEAD.sub("", (s or "").strip())
+    s = _FENCE_TAIL.sub("", s.strip())
     return s.strip()
 
+def _find_balanced(s: str, start: int) -> int:
+    """End index (inclusive) of the balanced {...} starting at s[start], or -1.
+
+    Scans only the brace positions via a compiled regex instead of walking
+    every char in Python."""
+    depth = 0
+    for m in _BRACE.finditer(s, start):
+        depth += 1 if m.group() == "{" else -1
+        if depth == 0:
+            return m.start()
+    return -1
+
 def _extract_json_object(s: str) -> str:
     s = _strip_code_fences(s)
     start = s.find("{")
     if start == -1:
         return "{}"
-    depth = 0
-    for i, c in enumerate(s[start:], start):
-        if c == "{":
-            depth += 1
-        elif c == "}":
-            depth -= 1
-            if depth == 0:
-                return s[start:i+1]
+    end = _find_balanced(s, start)
+    if end != -1:
+        return s[start:end+1]
     # unbalanced braces -> truncated
     return "{}"
 
 def _sanitize_trailing_commas(s: str) -> str:
-    s = re.sub(r",\s*}", "}", s)
-    s = re.sub(r",\s*]", "]", s)
+    s = _TRAIL_OBJ.sub("}", s)
+    s = _TRAIL_ARR.sub("]", s)
     return s
 
 def _defaults_for_ids(ids: List[str]) -> Dict[str, Dict[str, object]]:
@@ -66,25 +91,17 @@ def _salvage_partial(raw: str, allowed_ids: List[str]) -> Dict[str, Dict[str, ob
     and parse the first balanced `{...}` object that follows (if any).
     """
     out: Dict[str, Dict[str, object]] = {}
+    # compile each fid's key pattern once, not per re.search call
+    pats = {fid: re.compile(rf'"{re.escape(fid)}"\s*:\s*\{{') for fid in allowed_ids}
     for fid in allowed_ids:
-        key_pat = f'"{re.escape(fid)}"'
-        m = re.search(key_pat + r"\s*:\s*\{", raw)
+        m = pats[fid].search(raw)
         if not m:
             continue
         # from the '{' after the colon, walk braces to find end
         start = raw.find("{", m.end() - 1)
         if start == -1:
             continue
-        depth = 0
-        end = -1
-        for i, c in enumerate(raw[start:], start):
-            if c == "{":
-                depth += 1
-            elif c == "}":
-                depth -= 1
-                if depth == 0:
-                    end = i
-                    break
+        end = _find_balanced(raw, start)
         if end != -1:
             obj_text = raw[start:end+1]
             try:
@@ -106,10 +123,10 @@ def run_severity(claim_id: str, temperature: float = 0.1, verbose: bool = True)
     p = paths_for_claim(claim_id)
     in_case  = p.reports_dir / "case.json"
     out_path = p.reports_dir / "severity.json"
-    raw_path = p.reports_dir / "severity_raw.txt"  # append per batch for debugging
+    raw_path = p.reports_dir / "severity_raw.txt"  # written once when MEDLEGAL_DEBUG_LLM=1
     err_path = p.reports_dir / "severity_error.log"
 
-    data  = json.loads(in_case.read_text(encoding="utf-8"))
+    data  = read_json_utf8(in_case)
     case  = data.get("case") or {}
     flags = data.get("flags") or []
 
@@ -127,20 +144,25 @@ def run_severity(claim_id: str, temperature: float = 0.1, verbose: bool = True)
         "notes":   (case.get("notes") or "")[:800]
     }
 
-    genai.configure(api_key=GEMINI_API_KEY)
-    model = genai.GenerativeModel(model_name="gemini-2.5-pro")
-
     final_map: Dict[str, Dict[str, object]] = {}
 
-    # Clear previous raw file
-    try:
-        raw_path.write_text("", encoding="utf-8")
-    except Exception:
-        pass
+    # Debug output is buffered and flushed once at the end (when enabled)
+    raw_buf: List[str] = []
+    err_buf: List[str] = []
+
+    # Batch over flags: batches are independent, so fire them concurrently
+    # and merge results back in submission order.
+    # Row-marshal small flag sets into ONE call: reasons are ≤12 words
+    # (~25 tokens/flag), so ≤16 flags fit comfortably in MAX_OUTPUT_TOKENS
+    # and the extra round-trips are pure overhead.
+    if len(flags) <= 16 and len(flags) * 25 <= MAX_OUTPUT_TOKENS - 256:
+        batches = [flags]
+    else:
+        batches = [flags[i:i+BATCH_SIZE] for i in range(0, len(flags), BATCH_SIZE)]
 
-    # Batch over flags
-    for i in range(0, len(flags), BATCH_SIZE):
-        batch = flags[i:i+BATCH_SIZE]
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+
+    async def _score_batch(batch: List[dict]) -> str:
         batch_ids = [f["id"] for f in batch]
         flags_for_batch = [{
             "id": f["id"],
@@ -156,35 +178,51 @@ def run_severity(claim_id: str, temperature: float = 0.1, verbose: bool = True)
             "flags": flags_for_batch
         }
 
-        raw_text = None
+        # Content-addressed cache: identical batch payloads skip the round-trip
+        cache_id = llm_cache.cache_key(
+            "severity:", PROMPT, json.dumps(payload, ensure_ascii=False, sort_keys=True)
+        )
+        cached = llm_cache.get(claim_id, cache_id)
+        if cached is not None:
+            return cached
+
         try:
-            resp = model.generate_content(
-                [PROMPT, json.dumps(payload, ensure_ascii=False)],
-                generation_config=genai.types.GenerationConfig(
-                    temperature=temperature,
-                    top_p=0.9,
-                    max_output_tokens=MAX_OUTPUT_TOKENS,
-                    response_mime_type="application/json"
+            async with sem:
+                resp = await SEV_MODEL.generate_content_async(
+                    [PROMPT, json.dumps(payload, ensure_ascii=False)],
+                    generation_config=genai.types.GenerationConfig(
+                        temperature=temperature,
+                        top_p=0.9,
+                        max_output_tokens=MAX_OUTPUT_TOKENS,
+                        response_mime_type="application/json"
+                    )
                 )
-            )
-            raw_text = resp.text or "{}"
+            raw = resp.text or "{}"
+            llm_cache.put(claim_id, cache_id, raw)
+            return raw
         except Exception as e:
-            raw_text = f"<<EXCEPTION DURING GENERATION>>\n{e}\n\n{traceback.format_exc()}"
+            return f"<<EXCEPTION DURING GENERATION>>\n{e}\n\n{traceback.format_exc()}"
 
-        # Append raw for this batch
-        try:
-            with raw_path.open("a", encoding="utf-8") as fh:
-                fh.write(f"\n\n### BATCH {i//BATCH_SIZE + 1} ({len(batch_ids)} ids)\n")
-                fh.write(raw_text)
-                fh.write("\n")
-        except Exception:
-            pass
+    async def _score_all() -> List[str]:
+        return await asyncio.gather(*[_score_batch(b) for b in batches])
 
-        # Parse (normal path)
+    raw_texts = asyncio.run(_score_all())
+
+    for i, (batch, raw_text) in enumerate(zip(batches, raw_texts)):
+        batch_ids = [f["id"] for f in batch]
+
+        if DEBUG_LLM:
+            raw_buf.append(f"\n\n### BATCH {i + 1} ({len(batch_ids)} ids)\n{raw_text}\n")
+
+        # Parse (normal path): the API promises JSON, so try the raw text
+        # first and only fall back to fence-stripping/brace-walking repair
         parsed_map: Dict[str, Dict[str, object]] = {}
         try:
-            body = _sanitize_trailing_commas(_extract_json_object(raw_text))
-            parsed = json.loads(body)
+            try:
+                parsed = loads_json(raw_text)
+            except Exception:
+                body = _sanitize_trailing_commas(_extract_json_object(raw_text))
+                parsed = json.loads(body)
             if isinstance(parsed, dict):
                 for fid in batch_ids:
                     item = parsed.get(fid, {})
@@ -204,8 +242,7 @@ def run_severity(claim_id: str, temperature: float = 0.1, verbose: bool = True)
                 parsed_map.update(salvaged)
                 if not salvaged:
                     # log only if nothing salvaged
-                    with err_path.open("a", encoding="utf-8") as eh:
-                        eh.write(f"\nBATCH {i//BATCH_SIZE + 1} parse failed: {e}\n")
+                    err_buf.append(f"\nBATCH {i + 1} parse failed: {e}\n")
             except Exception:
                 pass
 
@@ -225,6 +262,19 @@ def run_severity(claim_id: str, temperature: float = 0.1, verbose: bool = True)
         final_map[fid]["multiplier"] = max(0.5, min(3.0, m))
         final_map[fid]["reason"] = _shorten_reason(item.get("reason", "default 1.0"))
 
+    # Flush buffered debug/error output in one write each
+    if DEBUG_LLM:
+        try:
+            raw_path.write_text("".join(raw_buf), encoding="utf-8")
+        except Exception:
+            pass
+    if err_buf:
+        try:
+            with err_path.open("a", encoding="utf-8") as eh:
+                eh.write("".join(err_buf))
+        except Exception:
+            pass
+
     write_json_utf8(out_path, final_map)
     if verbose:
         print(f"[severity] wrote {out_path} (ids={len(final_map)})")
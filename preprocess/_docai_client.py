@@ -1,19 +1,104 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from functools import lru_cache
 from typing import Optional
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 from google.api_core.client_options import ClientOptions
-from google.api_core.exceptions import GoogleAPICallError, NotFound, PermissionDenied, ResourceExhausted
+from google.api_core.exceptions import (
+    GoogleAPICallError, NotFound, PermissionDenied, ResourceExhausted, ServiceUnavailable,
+)
 from google.cloud import documentai
 from google.protobuf.json_format import MessageToDict
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
 from config import DOC_LOCATION
+from utils.io import write_json_maybe_zstd
 
+# Batch processing kicks in above this page count (and only when a staging
+# bucket is configured); below it, per-page sync RPCs are cheaper than a job.
+BATCH_MIN_PAGES = 8
+BATCH_SIZE = 50
+
+# Process-wide DocAI request budget (requests/minute). Keeping below quota
+# beats bursting past it and stalling in 429 retries.
+DOC_AI_QPM = int(os.environ.get("DOC_AI_QPM", "120"))
+
+class _TokenBucket:
+    """Evenly spaces requests at DOC_AI_QPM/min across all threads and tasks."""
+    def __init__(self, qpm: int):
+        self.interval = 60.0 / max(1, qpm)
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def _reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+            return slot - now
+
+    def wait(self) -> None:
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self) -> None:
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+_BUCKET = _TokenBucket(DOC_AI_QPM)
+
+# Quota pushback is transient: back off with jitter instead of dropping the
+# page. Only terminal failures fall through to the RuntimeError wrapping.
+_docai_retry = retry(
+    wait=wait_exponential_jitter(initial=1, max=60),
+    stop=stop_after_attempt(8),
+    retry=retry_if_exception_type((ResourceExhausted, ServiceUnavailable)),
+    reraise=True,
+)
+
+def gcs_staging_bucket() -> Optional[str]:
+    """Optional GCS bucket used to stage pages for batch_process_documents."""
+    return os.environ.get("MEDLEGAL_GCS_BUCKET")
+
+@lru_cache(maxsize=None)
 def _client():
+    # One client per process: construction resolves ADC credentials and does
+    # the TLS/channel handshake, which we don't want to repeat per page.
+    # gRPC clients are thread-safe, so all workers share the warm channel.
     return documentai.DocumentProcessorServiceClient(
         client_options=ClientOptions(api_endpoint=f"{DOC_LOCATION}-documentai.googleapis.com")
     )
 
+def _async_client():
+    # NOT cached: the async client binds to the running event loop, and each
+    # run_* stage drives its own asyncio.run. Stages construct one and pass
+    # it to every task, so the per-run cost is a single handshake.
+    return documentai.DocumentProcessorServiceAsyncClient(
+        client_options=ClientOptions(api_endpoint=f"{DOC_LOCATION}-documentai.googleapis.com")
+    )
+
+def write_doc_json(path: Path, doc) -> None:
+    """
+    Serialize a Document proto straight to JSON text (same snake_case shape
+    MessageToDict produced) without materializing the dict tree first.
+    Large sidecars land zstd-compressed as <path>.zst; readers resolve the
+    variant via utils.io.existing_json.
+    """
+    data = documentai.Document.to_json(
+        doc,
+        preserving_proto_field_name=True,
+        including_default_value_fields=False,
+    ).encode("utf-8")
+    write_json_maybe_zstd(path, data)
+
 def process_pdf_local(pdf_path: Path, processor_name: str,
                       pages: Optional[list[int]] = None,
-                      field_mask: Optional[str] = None) -> dict:
+                      field_mask: Optional[str] = None,
+                      as_proto: bool = False):
     client = _client()
     with open(pdf_path, "rb") as f:
         content = f.read()
@@ -27,8 +112,16 @@ def process_pdf_local(pdf_path: Path, processor_name: str,
         name=processor_name, raw_document=raw,
         field_mask=field_mask, process_options=opts
     )
+    @_docai_retry
+    def _call():
+        _BUCKET.wait()
+        return client.process_document(request=req)
+
     try:
-        result = client.process_document(request=req)
+        result = _call()
+        if as_proto:
+            # attribute-style access downstream; no dict tree allocated
+            return result.document
         return MessageToDict(result.document._pb, preserving_proto_field_name=True)
     except (NotFound, PermissionDenied, ResourceExhausted) as e:
         raise RuntimeError(f"[DocAI] processor='{processor_name}' file='{pdf_path.name}': {e}") from e
@@ -36,3 +129,121 @@ def process_pdf_local(pdf_path: Path, processor_name: str,
         raise RuntimeError(f"[DocAI] call failed for '{pdf_path.name}': {e}") from e
     except Exception as e:
         raise RuntimeError(f"[DocAI] unexpected error for '{pdf_path.name}': {e}") from e
+
+async def process_pdf_local_async(pdf_path: Path, processor_name: str,
+                                  pages: Optional[list[int]] = None,
+                                  field_mask: Optional[str] = None,
+                                  client=None, as_proto: bool = False):
+    """Async twin of process_pdf_local; pass a shared client when fanning out."""
+    if client is None:
+        client = _async_client()
+    with open(pdf_path, "rb") as f:
+        content = f.read()
+    raw = documentai.RawDocument(content=content, mime_type="application/pdf")
+    opts = None
+    if pages:
+        opts = documentai.ProcessOptions(
+            individual_page_selector=documentai.ProcessOptions.IndividualPageSelector(pages=pages)
+        )
+    req = documentai.ProcessRequest(
+        name=processor_name, raw_document=raw,
+        field_mask=field_mask, process_options=opts
+    )
+    @_docai_retry
+    async def _call():
+        await _BUCKET.wait_async()
+        return await client.process_document(request=req)
+
+    try:
+        result = await _call()
+        if as_proto:
+            return result.document
+        return MessageToDict(result.document._pb, preserving_proto_field_name=True)
+    except (NotFound, PermissionDenied, ResourceExhausted) as e:
+        raise RuntimeError(f"[DocAI] processor='{processor_name}' file='{pdf_path.name}': {e}") from e
+    except GoogleAPICallError as e:
+        raise RuntimeError(f"[DocAI] call failed for '{pdf_path.name}': {e}") from e
+    except Exception as e:
+        raise RuntimeError(f"[DocAI] unexpected error for '{pdf_path.name}': {e}") from e
+
+def process_pdfs_batch(pdf_paths: list[Path], processor_name: str,
+                       field_mask: Optional[str] = None,
+                       batch_size: int = BATCH_SIZE,
+                       timeout: int = 1800) -> dict:
+    """
+    Run batch_process_documents over many single-page PDFs at once.
+
+    Pages are staged under gs://<bucket>/docai_staging/<run>/input/, DocAI
+    writes JSON shards under .../output/, and we map them back by stem.
+    Returns {pdf_stem: Document proto} (use write_doc_json for sidecars).
+    Requires MEDLEGAL_GCS_BUCKET; callers fall back to per-page RPCs when
+    it is unset or the claim is small.
+    """
+    from google.cloud import storage  # deferred: only needed on the batch path
+
+    bucket_name = gcs_staging_bucket()
+    if not bucket_name:
+        raise RuntimeError("[DocAI] batch path requires MEDLEGAL_GCS_BUCKET")
+
+    gcs = storage.Client()
+    bucket = gcs.bucket(bucket_name)
+    out: dict = {}
+    run_prefix = f"docai_staging/{uuid.uuid4().hex}"
+
+    # Phase 1: stage all pages once
+    uri_by_stem: dict[str, str] = {}
+    for pdf in pdf_paths:
+        blob = bucket.blob(f"{run_prefix}/input/{pdf.name}")
+        blob.upload_from_filename(str(pdf))
+        uri_by_stem[pdf.stem] = f"gs://{bucket_name}/{run_prefix}/input/{pdf.name}"
+
+    client = _client()
+    try:
+        # Phase 2: one long-running job per batch_size pages
+        for i in range(0, len(pdf_paths), batch_size):
+            chunk = pdf_paths[i:i+batch_size]
+            input_cfg = documentai.BatchDocumentsInputConfig(
+                gcs_documents=documentai.GcsDocuments(documents=[
+                    documentai.GcsDocument(gcs_uri=uri_by_stem[p.stem], mime_type="application/pdf")
+                    for p in chunk
+                ])
+            )
+            out_uri = f"gs://{bucket_name}/{run_prefix}/output/{i}/"
+            output_cfg = documentai.DocumentOutputConfig(
+                gcs_output_config=documentai.DocumentOutputConfig.GcsOutputConfig(
+                    gcs_uri=out_uri,
+                    field_mask=field_mask,
+                )
+            )
+            req = documentai.BatchProcessRequest(
+                name=processor_name,
+                input_documents=input_cfg,
+                document_output_config=output_cfg,
+            )
+            op = client.batch_process_documents(request=req)
+            op.result(timeout=timeout)
+
+            # Phase 3: pull shards back; output layout is
+            # .../output/<i>/<operation>/<doc_index>/<input_stem>-<shard>.json
+            for blob in gcs.list_blobs(bucket_name, prefix=f"{run_prefix}/output/{i}/"):
+                if not blob.name.endswith(".json"):
+                    continue
+                shard_stem = PurePosixPath(blob.name).stem           # "<stem>-0"
+                stem = shard_stem.rsplit("-", 1)[0]
+                if stem in out:   # single-page inputs -> first shard has it all
+                    continue
+                out[stem] = documentai.Document.from_json(
+                    blob.download_as_bytes(), ignore_unknown_fields=True
+                )
+    except (NotFound, PermissionDenied, ResourceExhausted) as e:
+        raise RuntimeError(f"[DocAI] batch processor='{processor_name}': {e}") from e
+    except GoogleAPICallError as e:
+        raise RuntimeError(f"[DocAI] batch call failed: {e}") from e
+    finally:
+        # best-effort staging cleanup
+        try:
+            for blob in gcs.list_blobs(bucket_name, prefix=run_prefix):
+                blob.delete()
+        except Exception:
+            pass
+    return out
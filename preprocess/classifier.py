@@ -1,8 +1,11 @@
-import re, shutil
+import asyncio, os, re, shutil
+from functools import lru_cache
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from config import DOC_AI, paths_for_claim
-from ._docai_client import process_pdf_local
+from ._docai_client import (
+    BATCH_MIN_PAGES, _async_client, gcs_staging_bucket,
+    process_pdf_local, process_pdf_local_async, process_pdfs_batch, write_doc_json,
+)
 from utils.io import write_json_utf8, write_text_utf8
 
 # Your categories (exact strings)
@@ -12,8 +15,14 @@ CATEGORIES = [
 ]
 
 _norm_re = re.compile(r"[^a-z0-9]+")
+# deletes every ASCII char outside [a-z0-9] in one C-level translate pass;
+# the regex stays as the slow path for non-ASCII labels
+_norm_drop = str.maketrans("", "", "".join(
+    chr(c) for c in range(128) if not ("a" <= chr(c) <= "z" or "0" <= chr(c) <= "9")
+))
 def _norm(s: str) -> str:
-    return _norm_re.sub("", (s or "").lower())
+    s = (s or "").lower()
+    return s.translate(_norm_drop) if s.isascii() else _norm_re.sub("", s)
 
 CANON = { _norm(c): c for c in CATEGORIES if c != "other" }
 
@@ -31,29 +40,42 @@ KEYMAP = [
     (("diagram","drawing","illustration","operative sketch"), "MedicalDrawings"),
     (("collision scene","impact diagram","sketch of accident","vehicle position"), "Visualizations"),
 ]
+# One precompiled alternation per category: each probe is a single C-level
+# scan instead of one substring search per keyword, and the loop keeps the
+# original KEYMAP priority order with early return.
+_KEY_RES = [(re.compile("|".join(re.escape(k) for k in keys)), cat) for keys, cat in KEYMAP]
+
 def _fallback_from_text(text: str) -> str:
     t = (text or "").lower()
-    for keys, cat in KEYMAP:
-        if any(k in t for k in keys):
+    for pat, cat in _KEY_RES:
+        if pat.search(t):
             return cat
     return "other"
 
 # Confidence gate off (we’ll accept low conf too per your note)
 CONFIDENCE_THRESHOLD = 0.0
 
+# labels repeat heavily within a document (entity types, mention texts),
+# so memoize: repeat lookups skip normalization entirely
+@lru_cache(maxsize=4096)
 def _to_canonical(label: str) -> str:
     n = _norm(label)
     return CANON.get(n, "other")
 
-def _extract_candidates(doc: dict) -> list[tuple[str, float, str]]:
+def _extract_candidates(doc) -> list[tuple[str, float, str]]:
+    # attribute-style over the Document proto; classifier output arrives as
+    # entities (there is no top-level classification field in the schema).
+    # proto defaults confidence to 0.0 when unset -> map falsy to None,
+    # matching the old MessageToDict behavior of omitting it.
+    if not doc.entities:
+        # nothing to walk (common when a page yields no labels): straight
+        # to the text fallback without allocating anything
+        return []
     out = []
-
-    # Entities
-    for ent in (doc.get("entities") or []):
-        e_type = ent.get("type") or ""
-        e_mention = ent.get("mentionText") or ent.get("mention_text") or ""
-        conf = ent.get("confidence", None)
-        conf = float(conf) if conf not in (None, "") else None
+    for ent in doc.entities:
+        e_type = ent.type_ or ""
+        e_mention = ent.mention_text or ""
+        conf = float(ent.confidence) if ent.confidence else None
 
         # sometimes the label is in 'type'
         if _to_canonical(e_type) != "other":
@@ -63,37 +85,29 @@ def _extract_candidates(doc: dict) -> list[tuple[str, float, str]]:
             out.append((e_mention, conf, "entity.mentionText"))
 
         # properties may also contain labels
-        for prop in (ent.get("properties") or []):
-            p_type = prop.get("type") or ""
-            p_mention = prop.get("mentionText") or ""
-            p_conf = prop.get("confidence", conf)
-            p_conf = float(p_conf) if p_conf not in (None, "") else conf
+        for prop in ent.properties:
+            p_type = prop.type_ or ""
+            p_mention = prop.mention_text or ""
+            p_conf = float(prop.confidence) if prop.confidence else conf
             if _to_canonical(p_type) != "other":
                 out.append((p_type, p_conf, "entity.prop.type"))
             if _to_canonical(p_mention) != "other":
                 out.append((p_mention, p_conf, "entity.prop.mentionText"))
 
-    # Top-level classification(s)
-    for key in ("classification","classifications"):
-        if key in doc:
-            blocks = doc[key] if isinstance(doc[key], list) else [doc[key]]
-            for b in blocks:
-                lbl = b.get("category") or b.get("type") or b.get("label") or ""
-                conf = b.get("confidence", None)
-                conf = float(conf) if conf not in (None, "") else None
-                if _to_canonical(lbl) != "other":
-                    out.append((lbl, conf, f"document.{key}"))
-
     return out
 
 def _best(cands):
     if not cands: return None
     return max(((l, (c if c is not None else 1.0), s) for (l,c,s) in cands), key=lambda t: t[1])
 
-def _classify_one(page_pdf: Path, out_base: Path) -> tuple[str,str,dict]:
-    # force the fields we care about
-    fm = "entities,classification,classifications,text"
-    doc = process_pdf_local(page_pdf, DOC_AI["classifier"], pages=[1], field_mask=fm)
+# force the fields we care about; text rides along so the classifier call
+# can double as the OCR result downstream
+_FIELD_MASK = "entities,classification,classifications,text,pages.page_number"
+
+def _classify_one(page_pdf: Path, out_base: Path, doc=None, text_dir: Path | None = None) -> tuple[str,str,dict]:
+    if doc is None:
+        doc = process_pdf_local(page_pdf, DOC_AI["classifier"], pages=[1],
+                                field_mask=_FIELD_MASK, as_proto=True)
 
     cands = _extract_candidates(doc)
     debug = [{"label": l, "confidence": c, "source": s, "mapped": _to_canonical(l)} for (l,c,s) in cands]
@@ -106,12 +120,23 @@ def _classify_one(page_pdf: Path, out_base: Path) -> tuple[str,str,dict]:
         final = mapped if (conf is None or conf >= CONFIDENCE_THRESHOLD) else "other"
     else:
         # --- fallback from text ---
-        final = _fallback_from_text(doc.get("text",""))
+        final = _fallback_from_text(doc.text)
 
+    # run_classify pre-creates every category dir, so no mkdir per page here.
     dst_dir = out_base / final
-    dst_dir.mkdir(parents=True, exist_ok=True)
-    shutil.copy(page_pdf, dst_dir / page_pdf.name)
-    write_json_utf8(dst_dir / f"{page_pdf.stem}.classified.json", doc)
+    # the category bucket only needs an inode pointing at the page: hardlink
+    # (zero data copied) and fall back to a real copy across filesystems
+    dst = dst_dir / page_pdf.name
+    dst.unlink(missing_ok=True)
+    try:
+        os.link(page_pdf, dst)
+    except OSError:
+        shutil.copy(page_pdf, dst)
+    write_doc_json(dst_dir / f"{page_pdf.stem}.classified.json", doc)
+    # canonical text sidecar: ocr/collect stages check this before making
+    # their own DocAI call for the same page
+    if text_dir is not None and doc.text:
+        write_text_utf8(text_dir / f"{page_pdf.stem}.text.txt", doc.text)
     return page_pdf.name, final, {"best": best, "": final if best is None else None}
 
 def run_classify(claim_id: str, max_workers: int = 8, verbose: bool = True) -> None:
@@ -121,22 +146,44 @@ def run_classify(claim_id: str, max_workers: int = 8, verbose: bool = True) -> N
 
     pages = sorted(p.pages.glob("*.pdf"))  # instead of p.pages_1p
     if verbose:
-        print(f"[classify] pages: {len(pages)} from {p.pages.glob("*.pdf")}")
+        print(f"[classify] pages: {len(pages)} from {p.pages}")
         print(f"[classify] using processor: {DOC_AI['classifier']}")
 
     if not pages:
         print("[classify] no single-page PDFs found; did you run 'split'?")
         return
 
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
-        futures = {ex.submit(_classify_one, pg, p.classified_pages): pg for pg in pages}
-        for fut in as_completed(futures):
-            pg = futures[fut]
-            try:
-                name, cat, info = fut.result()
-                if verbose:
-                    print(f"[classify] ✔ {name} → {cat} ({'' if info['best'] is None else 'model'})")
-            except Exception as e:
-                err_path = p.classified_pages / f"{pg.stem}.classify.ERROR.txt"
-                write_text_utf8(err_path, str(e))
-                print(f"[classify] ✗ {pg.name} -> {err_path.name}: {e}")
+    # Large claims: one batch job over GCS beats N per-page RPCs
+    prefetched: dict = {}
+    if gcs_staging_bucket() and len(pages) >= BATCH_MIN_PAGES:
+        if verbose:
+            print(f"[classify] batch-processing {len(pages)} page(s) via GCS staging")
+        prefetched = process_pdfs_batch(pages, DOC_AI["classifier"], field_mask=_FIELD_MASK)
+
+    # Async fan-out: one shared gRPC channel, in-flight RPCs capped by a
+    # semaphore instead of one thread per request
+    async def _classify_all():
+        client = _async_client()
+        sem = asyncio.Semaphore(max_workers)
+
+        async def _one(pg: Path):
+            doc = prefetched.pop(pg.stem, None)
+            if doc is None:
+                async with sem:
+                    doc = await process_pdf_local_async(
+                        pg, DOC_AI["classifier"], pages=[1], field_mask=_FIELD_MASK,
+                        client=client, as_proto=True
+                    )
+            return _classify_one(pg, p.classified_pages, doc, text_dir=p.docai_json)
+
+        return await asyncio.gather(*[_one(pg) for pg in pages], return_exceptions=True)
+
+    for pg, res in zip(pages, asyncio.run(_classify_all())):
+        if isinstance(res, BaseException):
+            err_path = p.classified_pages / f"{pg.stem}.classify.ERROR.txt"
+            write_text_utf8(err_path, str(res))
+            print(f"[classify] ✗ {pg.name} -> {err_path.name}: {res}")
+        else:
+            name, cat, info = res
+            if verbose:
+                print(f"[classify] ✔ {name} → {cat} ({'' if info['best'] is None else 'model'})")
@@ -1,11 +1,11 @@
 # medlegal/preprocess/collect_text.py
 from __future__ import annotations
-import json, re
+import asyncio, re
 from pathlib import Path
 from typing import Dict, List, Tuple
 from config import DOC_AI, paths_for_claim
-from utils.io import write_text_utf8, write_json_utf8
-from preprocess._docai_client import process_pdf_local
+from utils.io import existing_json, loads_json, read_json_bytes, write_text_utf8, write_json_utf8
+from preprocess._docai_client import _async_client, process_pdf_local, process_pdf_local_async
 
 # robust patterns: _page_<n>.pdf OR last number in filename
 _PAGE_RE = re.compile(r"_page_(\d+)\.pdf$", re.IGNORECASE)
@@ -28,7 +28,7 @@ def _page_no(pdf: Path) -> int:
 
 def _load_text_from_json(jp: Path) -> str:
     try:
-        data = json.loads(jp.read_text(encoding="utf-8"))
+        data = loads_json(read_json_bytes(jp))
         # cover both shapes: {"text": "..."} or {"document": {"text": "..."}}
         if isinstance(data, dict):
             if "text" in data and isinstance(data["text"], str):
@@ -44,31 +44,56 @@ def _load_text_from_json(jp: Path) -> str:
 def _ensure_text_for_page(pdf: Path, out_json_dir: Path) -> str:
     """
     Returns text for this single-page PDF by:
-      1) using <stem>.classified.json if present
-      2) else using <stem>.ocr.json if present
-      3) else calls DocAI OCR once and writes <stem>.ocr.json, then returns text
+      1) using the <stem>.text.txt sidecar banked by classify/ocr if present
+      2) else using <stem>.classified.json if present
+      3) else using <stem>.ocr.json if present
+      4) else calls DocAI OCR once and writes the sidecars, then returns text
     """
-    # 1) classified
-    classified_json = pdf.with_name(f"{pdf.stem}.classified.json")
-    if classified_json.exists():
+    # 1) canonical text sidecar: plain read, no JSON parse, no RPC
+    # (run_collect_text creates out_json_dir once up front)
+    text_sidecar = out_json_dir / f"{pdf.stem}.text.txt"
+    if text_sidecar.exists():
+        try:
+            return text_sidecar.read_text(encoding="utf-8")
+        except Exception:
+            pass
+
+    # 2) classified
+    classified_json = existing_json(pdf.with_name(f"{pdf.stem}.classified.json"))
+    if classified_json is not None:
         txt = _load_text_from_json(classified_json)
         if txt:
             return txt
 
-    # 2) OCR sidecar
-    out_json_dir.mkdir(parents=True, exist_ok=True)
+    # 3) OCR sidecar
     ocr_json = out_json_dir / f"{pdf.stem}.ocr.json"
-    if ocr_json.exists():
-        txt = _load_text_from_json(ocr_json)
+    found = existing_json(ocr_json)
+    if found is not None:
+        txt = _load_text_from_json(found)
         if txt:
             return txt
 
-    # 3) Run DocAI OCR once (single-page PDF → pages=[1])
+    # 4) Run DocAI OCR once (single-page PDF → pages=[1])
     doc = process_pdf_local(pdf, DOC_AI["ocr"], pages=[1], field_mask="text")
     write_json_utf8(ocr_json, doc)
-    return _load_text_from_json(ocr_json)
-
-def run_collect_text(claim_id: str, verbose: bool = True) -> None:
+    txt = _load_text_from_json(ocr_json)
+    if txt:
+        write_text_utf8(text_sidecar, txt)
+    return txt
+
+def _needs_ocr(pdf: Path, out_json_dir: Path) -> bool:
+    """True when no sidecar on disk can supply this page's text."""
+    if (out_json_dir / f"{pdf.stem}.text.txt").exists():
+        return False
+    cj = existing_json(pdf.with_name(f"{pdf.stem}.classified.json"))
+    if cj is not None and _load_text_from_json(cj):
+        return False
+    oj = existing_json(out_json_dir / f"{pdf.stem}.ocr.json")
+    if oj is not None and _load_text_from_json(oj):
+        return False
+    return True
+
+def run_collect_text(claim_id: str, max_workers: int = 8, verbose: bool = True) -> None:
     """
     Writes:
       07_text/
@@ -103,48 +128,72 @@ def run_collect_text(claim_id: str, verbose: bool = True) -> None:
             return
         groups = [("other", raw_pages)]
 
-    # Manifest & citations
-    manifest: Dict[str, List[str]] = {}
-    citations: Dict[str, Dict[str, object]] = {}
-
-    # Per-category text files
-    for cat, pdfs in groups:
+    # OCR fallbacks up front, fanned out like run_ocr: the write loop below
+    # is serial, so any page still lacking text would otherwise block it on
+    # one DocAI RPC at a time
+    p.docai_json.mkdir(parents=True, exist_ok=True)
+    todo = [pdf for _, pdfs in groups for pdf in pdfs if _needs_ocr(pdf, p.docai_json)]
+    if todo:
         if verbose:
-            print(f"[collect] {cat}: {len(pdfs)} page(s)")
-        manifest[cat] = [pdf.name for pdf in pdfs]
-
-        cat_lines: List[str] = []
-        for pdf in pdfs:
-            pg = _page_no(pdf)
-            cite = f"{cat}#{pg}"
-            stem = pdf.stem
-
-            citations[stem] = {"category": cat, "page": pg, "citation": cite, "file": pdf.name}
-            txt = _ensure_text_for_page(pdf, p.docai_json)
+            print(f"[collect] OCR fallback for {len(todo)} page(s)")
 
-            cat_lines.append(f"\n\n=== {cite} :: {pdf.name} ===\n")
-            cat_lines.append(txt or "[[NO_TEXT_EXTRACTED]]")
+        async def _fetch_all():
+            client = _async_client()
+            sem = asyncio.Semaphore(max_workers)
 
-        write_text_utf8(text_dir / f"{cat}.txt", "\n".join(cat_lines))
+            async def _one(pdf: Path):
+                async with sem:
+                    return await process_pdf_local_async(
+                        pdf, DOC_AI["ocr"], pages=[1], field_mask="text", client=client
+                    )
 
-    # ALL.txt in category+page order
-    all_lines: List[str] = []
-    for cat, pdfs in groups:
-        for pdf in pdfs:
-            pg = _page_no(pdf)
-            cite = f"{cat}#{pg}"
+            return await asyncio.gather(*[_one(pdf) for pdf in todo], return_exceptions=True)
 
-            # prefer classified JSON if present; else OCR sidecar; else call OCR
-            classified_json = pdf.with_name(f"{pdf.stem}.classified.json")
-            if classified_json.exists():
-                txt = _load_text_from_json(classified_json)
-            else:
-                txt = _ensure_text_for_page(pdf, p.docai_json)
+        for pdf, doc in zip(todo, asyncio.run(_fetch_all())):
+            if isinstance(doc, BaseException):
+                continue  # the serial path below retries and reports it
+            write_json_utf8(p.docai_json / f"{pdf.stem}.ocr.json", doc)
+            txt = doc.get("text") or ""
+            if txt:
+                write_text_utf8(p.docai_json / f"{pdf.stem}.text.txt", txt)
 
-            all_lines.append(f"\n\n=== {cite} :: {pdf.name} ===\n")
-            all_lines.append(txt or "[[NO_TEXT_EXTRACTED]]")
+    # Manifest & citations
+    manifest: Dict[str, List[str]] = {}
+    citations: Dict[str, Dict[str, object]] = {}
 
-    write_text_utf8(text_dir / "ALL.txt", "\n".join(all_lines))
+    # Per-category text files; ALL.txt streams in the same pass (same
+    # category+page order). Writing chunks straight to buffered handles
+    # keeps peak memory at one page's text, not the whole corpus - the
+    # old list + "\n".join held every transcript twice at the join.
+    with open(text_dir / "ALL.txt", "w", encoding="utf-8", buffering=1 << 20) as all_fh:
+        all_first = True
+        for cat, pdfs in groups:
+            if verbose:
+                print(f"[collect] {cat}: {len(pdfs)} page(s)")
+            manifest[cat] = [pdf.name for pdf in pdfs]
+
+            with open(text_dir / f"{cat}.txt", "w", encoding="utf-8", buffering=1 << 20) as cat_fh:
+                cat_first = True
+                for pdf in pdfs:
+                    pg = _page_no(pdf)
+                    cite = f"{cat}#{pg}"
+                    stem = pdf.stem
+
+                    citations[stem] = {"category": cat, "page": pg, "citation": cite, "file": pdf.name}
+                    txt = _ensure_text_for_page(pdf, p.docai_json)
+
+                    for chunk in (f"\n\n=== {cite} :: {pdf.name} ===\n",
+                                  txt or "[[NO_TEXT_EXTRACTED]]"):
+                        # "\n" separators between chunks reproduce the old
+                        # "\n".join() output byte for byte
+                        if not cat_first:
+                            cat_fh.write("\n")
+                        cat_fh.write(chunk)
+                        cat_first = False
+                        if not all_first:
+                            all_fh.write("\n")
+                        all_fh.write(chunk)
+                        all_first = False
     write_json_utf8(text_dir / "manifest.json", manifest)
     write_json_utf8(text_dir / "citations.json", citations)
 
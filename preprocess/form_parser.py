@@ -1,15 +1,19 @@
 # medlegal/preprocess/form_parser.py
+import asyncio
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from config import DOC_AI, paths_for_claim
-from ._docai_client import process_pdf_local
+from ._docai_client import (
+    BATCH_MIN_PAGES, _async_client, gcs_staging_bucket,
+    process_pdf_local, process_pdf_local_async, process_pdfs_batch, write_doc_json,
+)
 from utils.io import write_json_utf8, write_text_utf8
 
 FORM_CATS = ["Bills", "Forms"]
 
-def _form_one(page_pdf: Path, out_json: Path) -> str:
-    doc = process_pdf_local(page_pdf, DOC_AI["form"], pages=[1])
-    write_json_utf8(out_json / f"{page_pdf.stem}.form.json", doc)
+def _form_one(page_pdf: Path, out_json: Path, doc=None) -> str:
+    if doc is None:
+        doc = process_pdf_local(page_pdf, DOC_AI["form"], pages=[1], as_proto=True)
+    write_doc_json(out_json / f"{page_pdf.stem}.form.json", doc)
     return page_pdf.name
 
 def run_form_parser(claim_id: str, max_workers: int = 8, verbose: bool = True) -> None:
@@ -28,15 +32,34 @@ def run_form_parser(claim_id: str, max_workers: int = 8, verbose: bool = True) -
     if verbose:
         print(f"[form] pages: {len(pages)} across {FORM_CATS}")
 
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
-        futures = {ex.submit(_form_one, pg, p.docai_json): pg for pg in pages}
-        for fut in as_completed(futures):
-            pg = futures[fut]
-            try:
-                name = fut.result()
-                if verbose:
-                    print(f"[form] ✔ {name}")
-            except Exception as e:
-                err_path = p.docai_json / f"{pg.stem}.form.ERROR.txt"
-                write_text_utf8(err_path, str(e))
-                print(f"[form] ✗ {pg.name} -> {err_path.name}: {e}")
+    # Large claims: one batch job over GCS beats N per-page RPCs
+    prefetched: dict = {}
+    if gcs_staging_bucket() and len(pages) >= BATCH_MIN_PAGES:
+        if verbose:
+            print(f"[form] batch-processing {len(pages)} page(s) via GCS staging")
+        prefetched = process_pdfs_batch(pages, DOC_AI["form"])
+
+    # Async fan-out: one shared gRPC channel, in-flight RPCs capped by a
+    # semaphore instead of one thread per request
+    async def _form_all():
+        client = _async_client()
+        sem = asyncio.Semaphore(max_workers)
+
+        async def _one(pg: Path):
+            doc = prefetched.pop(pg.stem, None)
+            if doc is None:
+                async with sem:
+                    doc = await process_pdf_local_async(
+                        pg, DOC_AI["form"], pages=[1], client=client, as_proto=True
+                    )
+            return _form_one(pg, p.docai_json, doc)
+
+        return await asyncio.gather(*[_one(pg) for pg in pages], return_exceptions=True)
+
+    for pg, res in zip(pages, asyncio.run(_form_all())):
+        if isinstance(res, BaseException):
+            err_path = p.docai_json / f"{pg.stem}.form.ERROR.txt"
+            write_text_utf8(err_path, str(res))
+            print(f"[form] ✗ {pg.name} -> {err_path.name}: {res}")
+        elif verbose:
+            print(f"[form] ✔ {res}")
@@ -1,13 +1,17 @@
 # medlegal/preprocess/layout.py
+import asyncio
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from config import DOC_AI, paths_for_claim
-from ._docai_client import process_pdf_local
+from ._docai_client import (
+    BATCH_MIN_PAGES, _async_client, gcs_staging_bucket,
+    process_pdf_local, process_pdf_local_async, process_pdfs_batch, write_doc_json,
+)
 from utils.io import write_json_utf8, write_text_utf8
 
-def _layout_one(chunk_pdf: Path, out_dir: Path) -> str:
-    doc = process_pdf_local(chunk_pdf, DOC_AI["layout"])
-    write_json_utf8(out_dir / f"{chunk_pdf.stem}.layout.json", doc)
+def _layout_one(chunk_pdf: Path, out_dir: Path, doc=None) -> str:
+    if doc is None:
+        doc = process_pdf_local(chunk_pdf, DOC_AI["layout"], as_proto=True)
+    write_doc_json(out_dir / f"{chunk_pdf.stem}.layout.json", doc)
     return chunk_pdf.name
 
 def run_layout(claim_id: str, max_workers: int = 8, verbose: bool = True) -> None:
@@ -22,15 +26,33 @@ def run_layout(claim_id: str, max_workers: int = 8, verbose: bool = True) -> Non
         print(f"[layout] no chunks found. did you run 'split'?")
         return
 
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
-        futures = {ex.submit(_layout_one, c, p.layout_json): c for c in chunks}
-        for fut in as_completed(futures):
-            c = futures[fut]
-            try:
-                name = fut.result()
-                if verbose:
-                    print(f"[layout] ✔ {name}")
-            except Exception as e:
-                err_path = p.layout_json / f"{c.stem}.layout.ERROR.txt"
-                write_text_utf8(err_path, str(e))
-                print(f"[layout] ✗ {c.name} -> {err_path.name}: {e}")
+    # Many chunks: one batch job over GCS beats N per-chunk RPCs
+    prefetched: dict = {}
+    if gcs_staging_bucket() and len(chunks) >= BATCH_MIN_PAGES:
+        if verbose:
+            print(f"[layout] batch-processing {len(chunks)} chunk(s) via GCS staging")
+        prefetched = process_pdfs_batch(chunks, DOC_AI["layout"])
+
+    # Async fan-out: one shared gRPC channel, in-flight RPCs capped by a
+    # semaphore instead of one thread per request
+    async def _layout_all():
+        client = _async_client()
+        sem = asyncio.Semaphore(max_workers)
+
+        async def _one(c: Path):
+            doc = prefetched.pop(c.stem, None)
+            if doc is None:
+                async with sem:
+                    doc = await process_pdf_local_async(c, DOC_AI["layout"],
+                                                        client=client, as_proto=True)
+            return _layout_one(c, p.layout_json, doc)
+
+        return await asyncio.gather(*[_one(c) for c in chunks], return_exceptions=True)
+
+    for c, res in zip(chunks, asyncio.run(_layout_all())):
+        if isinstance(res, BaseException):
+            err_path = p.layout_json / f"{c.stem}.layout.ERROR.txt"
+            write_text_utf8(err_path, str(res))
+            print(f"[layout] ✗ {c.name} -> {err_path.name}: {res}")
+        elif verbose:
+            print(f"[layout] ✔ {res}")
@@ -1,120 +1,182 @@
 # medlegal/preprocess/normalize.py
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import json
+import mmap
 import pandas as pd
 from config import paths_for_claim
-from utils.io import write_text_utf8
+from utils.io import loads_json, read_json_bytes, write_text_utf8
 import hashlib
+import os
 
-def _sha1(s: str) -> str:
-    return hashlib.sha1(s.encode("utf-8", errors="ignore")).hexdigest()
+# Below this many sidecars, pool spin-up costs more than it saves
+_POOL_MIN_FILES = 16
+
+# Above this size, mmap the sidecar so the parse reads straight from the
+# page cache instead of a second heap copy of the whole file.
+_MMAP_MIN = 1 << 20
+
+# Hashing is only for intra-claim dedup, not integrity: blake2b is the
+# fastest digest in hashlib and 16 bytes of it is ample for that.
+def _text_hash(s: str) -> str:
+    return hashlib.blake2b(s.encode("utf-8", errors="ignore"), digest_size=16).hexdigest()
 
 def _read_json(p: Path) -> dict | None:
+    # orjson takes bytes directly, skipping the decode-to-str intermediate
     try:
-        return json.loads(p.read_text(encoding="utf-8"))
+        if p.name.endswith(".zst"):
+            return loads_json(read_json_bytes(p))
+        if p.stat().st_size >= _MMAP_MIN:
+            with open(p, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                try:
+                    return loads_json(memoryview(mm))
+                except TypeError:  # stdlib fallback can't parse a buffer
+                    return json.loads(mm[:])
+        return loads_json(p.read_bytes())
     except Exception:
         return None
 
+def _parse_one(jp: Path, cat_guess: str | None):
+    """Parse one sidecar into (page_row, forms_rows, tables_rows) or None.
+
+    Top-level so ProcessPoolExecutor can pickle it; parsing MB-scale JSON
+    is CPU-bound and holds the GIL, so threads wouldn't help here.
+    """
+    data = _read_json(jp)
+    if not data:
+        return None
+
+    # doc_id is stem of file (e.g., X_page_3.ocr/form)
+    doc_id = jp.name.removesuffix(".zst").removesuffix(".json")
+
+    text = data.get("text", "") or ""
+    # Dedup: hash to filter reduplicated blobs; texts under 64 chars
+    # dedup by identity, no digest needed
+    text_hash = text if len(text) < 64 else _text_hash(text)
+    page_row = {
+        "doc_id": doc_id,
+        "category": cat_guess or "unknown",
+        "text_len": len(text),
+        "text_hash": text_hash,
+        "text": text[:20000]  # cap to keep CSV reasonable; raw JSON stays on disk
+    }
+
+    forms_rows = []
+    tables_rows = []
+
+    # --- extract form fields when present ---
+    # DocAI Form Parser places fields at pages[].form_fields[*].fieldName/fieldValue -> text_anchor
+    # Some versions also populate entities with normalized values.
+    # We’ll read from pages[].form_fields first.
+    for pg in (data.get("pages") or []):
+        for ff in (pg.get("form_fields") or []):
+            key = (ff.get("fieldName") or {}).get("text_anchor") or ff.get("field_name", {})
+            val = (ff.get("fieldValue") or {}).get("text_anchor") or ff.get("field_value", {})
+            key_text = key.get("content") or ""  # recent API includes content
+            val_text = val.get("content") or ""
+            forms_rows.append({
+                "doc_id": doc_id, "page_number": pg.get("page_number"),
+                "key": key_text, "value": val_text
+            })
+
+    # --- extract table cells into a flat table ---
+    for pg in (data.get("pages") or []):
+        for ti, tb in enumerate(pg.get("tables") or []):
+            # headers
+            headers = []
+            for r in (tb.get("header_rows") or []):
+                cells = []
+                for c in (r.get("cells") or []):
+                    blocks = (c.get("layout") or {}).get("text_anchor") or {}
+                    cells.append(blocks.get("content",""))
+                headers.append("|".join(cells))
+            header_text = headers[0] if headers else ""
+            # body
+            for ri, r in enumerate(tb.get("body_rows") or []):
+                vals = []
+                for c in (r.get("cells") or []):
+                    blocks = (c.get("layout") or {}).get("text_anchor") or {}
+                    vals.append(blocks.get("content",""))
+                tables_rows.append({
+                    "doc_id": doc_id, "page_number": pg.get("page_number"),
+                    "table_index": ti, "row_index": ri,
+                    "header": header_text, "row": "|".join(vals)
+                })
+
+    return page_row, forms_rows, tables_rows
+
 def run_normalize(claim_id: str, verbose: bool = True) -> None:
     p = paths_for_claim(claim_id)
     out_dir = p.pandas
     out_dir.mkdir(parents=True, exist_ok=True)
 
     # Gather all doc JSONs (ocr + form) we produced
-    jpaths = sorted((p.docai_json).glob("*.json"))
+    jpaths = sorted([*p.docai_json.glob("*.json"), *p.docai_json.glob("*.json.zst")])
     if verbose:
         print(f"[normalize] input JSON files: {len(jpaths)} from {p.docai_json}")
 
+    # One walk of the classified tree up front; the old per-sidecar rglob
+    # re-traversed the whole tree for every JSON (quadratic in pages)
+    stem_to_category = {g.stem: g.parent.name for g in p.classified_pages.rglob("*.pdf")}
+    cats = [
+        stem_to_category.get(jp.name.removesuffix(".zst").removesuffix(".json").split(".")[0])
+        for jp in jpaths
+    ]
+
+    if len(jpaths) >= _POOL_MIN_FILES:
+        with ProcessPoolExecutor() as ex:
+            results = list(ex.map(_parse_one, jpaths, cats, chunksize=32))
+    else:
+        results = [_parse_one(jp, c) for jp, c in zip(jpaths, cats)]
+
     pages_rows = []
     forms_rows = []
     tables_rows = []
-
-    for jp in jpaths:
-        data = _read_json(jp)
-        if not data: 
+    for res in results:
+        if res is None:
             continue
+        page_row, f_rows, t_rows = res
+        pages_rows.append(page_row)
+        forms_rows.extend(f_rows)
+        tables_rows.extend(t_rows)
 
-        # doc_id is stem of file (e.g., X_page_3.ocr/form)
-        doc_id = jp.stem
-
-        # category is the parent folder one level above the PDF (inside 03_classified_pages)
-        # try to locate the matching pdf to infer the category
-        cat_guess = None
-        pdf_guess = p.classified_pages.rglob(f"{doc_id.split('.')[0]}.pdf")
-        for g in pdf_guess:
-            # parent folder under 03_classified_pages is the category
-            cat_guess = g.parent.name
-            break
-
-        text = data.get("text", "") or ""
-        # Dedup: hash to filter reduplicated blobs
-        text_hash = _sha1(text)
-        pages_rows.append({
-            "doc_id": doc_id,
-            "category": cat_guess or "unknown",
-            "text_len": len(text),
-            "text_hash": text_hash,
-            "text": text[:20000]  # cap to keep CSV reasonable; raw JSON stays on disk
-        })
-
-        # --- extract form fields when present ---
-        # DocAI Form Parser places fields at pages[].form_fields[*].fieldName/fieldValue -> text_anchor
-        # Some versions also populate entities with normalized values.
-        # We’ll read from pages[].form_fields first.
-        for pg in (data.get("pages") or []):
-            for ff in (pg.get("form_fields") or []):
-                key = (ff.get("fieldName") or {}).get("text_anchor") or ff.get("field_name", {})
-                val = (ff.get("fieldValue") or {}).get("text_anchor") or ff.get("field_value", {})
-                key_text = key.get("content") or ""  # recent API includes content
-                val_text = val.get("content") or ""
-                forms_rows.append({
-                    "doc_id": doc_id, "page_number": pg.get("page_number"),
-                    "key": key_text, "value": val_text
-                })
-
-        # --- extract table cells into a flat table ---
-        for pg in (data.get("pages") or []):
-            for ti, tb in enumerate(pg.get("tables") or []):
-                # headers
-                headers = []
-                for r in (tb.get("header_rows") or []):
-                    cells = []
-                    for c in (r.get("cells") or []):
-                        blocks = (c.get("layout") or {}).get("text_anchor") or {}
-                        cells.append(blocks.get("content",""))
-                    headers.append("|".join(cells))
-                header_text = headers[0] if headers else ""
-                # body
-                for ri, r in enumerate(tb.get("body_rows") or []):
-                    vals = []
-                    for c in (r.get("cells") or []):
-                        blocks = (c.get("layout") or {}).get("text_anchor") or {}
-                        vals.append(blocks.get("content",""))
-                    tables_rows.append({
-                        "doc_id": doc_id, "page_number": pg.get("page_number"),
-                        "table_index": ti, "row_index": ri,
-                        "header": header_text, "row": "|".join(vals)
-                    })
-
-    # Build DataFrames
-    df_pages = pd.DataFrame(pages_rows)
-    df_forms = pd.DataFrame(forms_rows)
-    df_tables = pd.DataFrame(tables_rows)
+    # Build DataFrames with fixed column order; `category` repeats heavily,
+    # so store it as categorical rather than one Python str per row
+    df_pages = pd.DataFrame.from_records(
+        pages_rows, columns=["doc_id", "category", "text_len", "text_hash", "text"]
+    )
+    if not df_pages.empty:
+        df_pages = df_pages.astype({"category": "category", "text_hash": "string[pyarrow]"})
+    df_forms = pd.DataFrame.from_records(
+        forms_rows, columns=["doc_id", "page_number", "key", "value"]
+    )
+    df_tables = pd.DataFrame.from_records(
+        tables_rows,
+        columns=["doc_id", "page_number", "table_index", "row_index", "header", "row"],
+    )
 
     # Drop duplicate texts by hash (keep first)
     if not df_pages.empty:
         before = len(df_pages)
-        df_pages = df_pages.drop_duplicates(subset=["text_hash"])
+        df_pages = df_pages.drop_duplicates(subset=["text_hash"], ignore_index=True)
         after = len(df_pages)
         if verbose:
             print(f"[normalize] de-duplicated pages by text_hash: {before} → {after}")
 
-    # Write compact CSVs
-    df_pages.to_csv(out_dir / "pages.csv", index=False, encoding="utf-8")
-    df_forms.to_csv(out_dir / "forms.csv", index=False, encoding="utf-8")
-    df_tables.to_csv(out_dir / "tables.csv", index=False, encoding="utf-8")
+    # Parquet: columnar + zstd beats CSV on both write time and footprint,
+    # and the 06_pandas outputs are only ever read back through pandas
+    # (storage/db.py already writes parquet for the same reason)
+    df_pages.to_parquet(out_dir / "pages.parquet", engine="pyarrow", compression="zstd")
+    df_forms.to_parquet(out_dir / "forms.parquet", engine="pyarrow", compression="zstd")
+    df_tables.to_parquet(out_dir / "tables.parquet", engine="pyarrow", compression="zstd")
+
+    # opt-in CSV export for eyeballing in a spreadsheet
+    if os.environ.get("MEDLEGAL_CSV_EXPORT") == "1":
+        df_pages.to_csv(out_dir / "pages.csv", index=False, encoding="utf-8")
+        df_forms.to_csv(out_dir / "forms.csv", index=False, encoding="utf-8")
+        df_tables.to_csv(out_dir / "tables.csv", index=False, encoding="utf-8")
 
     if verbose:
-        print(f"[normalize] wrote {out_dir/'pages.csv'} ({len(df_pages)} rows)")
-        print(f"[normalize] wrote {out_dir/'forms.csv'} ({len(df_forms)} rows)")
-        print(f"[normalize] wrote {out_dir/'tables.csv'} ({len(df_tables)} rows)")
+        print(f"[normalize] wrote {out_dir/'pages.parquet'} ({len(df_pages)} rows)")
+        print(f"[normalize] wrote {out_dir/'forms.parquet'} ({len(df_forms)} rows)")
+        print(f"[normalize] wrote {out_dir/'tables.parquet'} ({len(df_tables)} rows)")
@@ -1,9 +1,11 @@
+import asyncio
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from config import DOC_AI, paths_for_claim
-from ._docai_client import process_pdf_local
-from utils.io import write_json_utf8, write_text_utf8
-import json
+from ._docai_client import (
+    BATCH_MIN_PAGES, _async_client, gcs_staging_bucket,
+    process_pdf_local, process_pdf_local_async, process_pdfs_batch, write_doc_json,
+)
+from utils.io import existing_json, loads_json, read_json_bytes, write_text_utf8
 
 # Everything except Bills & Forms goes to OCR if we don't already have text
 OCR_CATS = [
@@ -12,24 +14,36 @@ OCR_CATS = [
 ]
 
 def _has_text(json_path: Path) -> bool:
+    jp = existing_json(json_path)
+    if jp is None:
+        return False
     try:
-        data = json.loads(json_path.read_text(encoding="utf-8"))
+        data = loads_json(read_json_bytes(jp))
         return bool(data.get("text"))
     except Exception:
         return False
 
-def _ocr_one(page_pdf: Path, out_json: Path) -> str:
+_FIELD_MASK = "text,pages.page_number,layout"
+
+def _ocr_one(page_pdf: Path, out_json: Path, doc=None) -> str:
+    # classifier already banked this page's text -> nothing to do
+    if doc is None and (out_json / f"{page_pdf.stem}.text.txt").exists():
+        return f"{page_pdf.name} (skipped; text sidecar present)"
     # if classifier JSON (any cat) already saved with text, skip
-    # we search sibling *_classified.json we wrote during classify
-    classified_json = list(page_pdf.parent.glob(f"{page_pdf.stem}.classified.json"))
-    if classified_json and _has_text(classified_json[0]):
-        # copy classifier json into docai_json as the ocr output for consistency
-        target = out_json / f"{page_pdf.stem}.ocr.json"
-        if not target.exists():
-            target.write_text(classified_json[0].read_text(encoding="utf-8"), encoding="utf-8")
+    classified_json = existing_json(page_pdf.parent / f"{page_pdf.stem}.classified.json")
+    if classified_json is not None and _has_text(classified_json):
+        # copy classifier json into docai_json as the ocr output for
+        # consistency, keeping the source's (possibly .zst) suffix
+        target = out_json / classified_json.name.replace(".classified.", ".ocr.", 1)
+        if existing_json(out_json / f"{page_pdf.stem}.ocr.json") is None:
+            target.write_bytes(classified_json.read_bytes())
         return f"{page_pdf.name} (skipped; already had text)"
-    doc = process_pdf_local(page_pdf, DOC_AI["ocr"], pages=[1], field_mask="text,pages.page_number,layout")
-    write_json_utf8(out_json / f"{page_pdf.stem}.ocr.json", doc)
+    if doc is None:
+        doc = process_pdf_local(page_pdf, DOC_AI["ocr"], pages=[1],
+                                field_mask=_FIELD_MASK, as_proto=True)
+    write_doc_json(out_json / f"{page_pdf.stem}.ocr.json", doc)
+    if doc.text:
+        write_text_utf8(out_json / f"{page_pdf.stem}.text.txt", doc.text)
     return page_pdf.name
 
 def run_ocr(claim_id: str, max_workers: int = 8, verbose: bool = True) -> None:
@@ -47,15 +61,40 @@ def run_ocr(claim_id: str, max_workers: int = 8, verbose: bool = True) -> None:
         print("[ocr] nothing to OCR")
         return
 
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
-        futures = {ex.submit(_ocr_one, pg, p.docai_json): pg for pg in pages}
-        for fut in as_completed(futures):
-            pg = futures[fut]
-            try:
-                msg = fut.result()
-                if verbose:
-                    print(f"[ocr] ✔ {msg}")
-            except Exception as e:
-                err_path = p.docai_json / f"{pg.stem}.ocr.ERROR.txt"
-                write_text_utf8(err_path, str(e))
-                print(f"[ocr] ✗ {pg.name} -> {err_path.name}: {e}")
+    # Large claims: batch-OCR only the pages that still need text
+    prefetched: dict = {}
+    if gcs_staging_bucket() and len(pages) >= BATCH_MIN_PAGES:
+        todo = [pg for pg in pages
+                if not (p.docai_json / f"{pg.stem}.text.txt").exists()
+                and not _has_text(pg.parent / f"{pg.stem}.classified.json")]
+        if todo:
+            if verbose:
+                print(f"[ocr] batch-processing {len(todo)} page(s) via GCS staging")
+            prefetched = process_pdfs_batch(todo, DOC_AI["ocr"], field_mask=_FIELD_MASK)
+
+    # Async fan-out: one shared gRPC channel, in-flight RPCs capped by a
+    # semaphore instead of one thread per request
+    async def _ocr_all():
+        client = _async_client()
+        sem = asyncio.Semaphore(max_workers)
+
+        async def _one(pg: Path):
+            doc = prefetched.pop(pg.stem, None)
+            if doc is None and not (p.docai_json / f"{pg.stem}.text.txt").exists() \
+                    and not _has_text(pg.parent / f"{pg.stem}.classified.json"):
+                async with sem:
+                    doc = await process_pdf_local_async(
+                        pg, DOC_AI["ocr"], pages=[1], field_mask=_FIELD_MASK,
+                        client=client, as_proto=True
+                    )
+            return _ocr_one(pg, p.docai_json, doc)
+
+        return await asyncio.gather(*[_one(pg) for pg in pages], return_exceptions=True)
+
+    for pg, res in zip(pages, asyncio.run(_ocr_all())):
+        if isinstance(res, BaseException):
+            err_path = p.docai_json / f"{pg.stem}.ocr.ERROR.txt"
+            write_text_utf8(err_path, str(res))
+            print(f"[ocr] ✗ {pg.name} -> {err_path.name}: {res}")
+        elif verbose:
+            print(f"[ocr] ✔ {res}")
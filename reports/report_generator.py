@@ -21,9 +21,18 @@ def run_report(claim_id: str, top_k: int = 8, verbose: bool = True) -> None:
     out_dir = p.reports_dir
     out_dir.mkdir(parents=True, exist_ok=True)
 
+    out_md = out_dir / f"{claim_id}_report.md"
+    scoring_path = out_dir / "scoring.json"
+    # Skip regeneration when the report is already newer than the scoring it renders
+    if out_md.exists() and scoring_path.exists() \
+            and out_md.stat().st_mtime_ns > scoring_path.stat().st_mtime_ns:
+        if verbose:
+            print(f"[report] {out_md} up to date; skipping")
+        return
+
     case = json.loads((out_dir / "case.json").read_text(encoding="utf-8"))
     sev  = json.loads((out_dir / "severity.json").read_text(encoding="utf-8"))
-    sc   = json.loads((out_dir / "scoring.json").read_text(encoding="utf-8"))
+    sc   = json.loads(scoring_path.read_text(encoding="utf-8"))
 
     lines = []
     lines.append(f"# Insurance Claim – Automated Draft\n**Claim ID:** {claim_id}\n")
@@ -82,7 +91,6 @@ def run_report(claim_id: str, top_k: int = 8, verbose: bool = True) -> None:
     lines.append(_sec("Top Red Flags / Contradictions"))
     lines += [_fmt_flag(f) for f in red] or ["(none)"]
 
-    out_md = out_dir / f"{claim_id}_report.md"
     write_text_utf8(out_md, "\n".join(lines))
     if verbose:
         print(f"[report] wrote {out_md}")
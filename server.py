@@ -1,20 +1,49 @@
 # server.py
-from flask import Flask, request, send_from_directory, Response, jsonify
+import functools
 import os
-import requests
+
+import httpx
 import markdown
+from fastapi import FastAPI, File, Form, UploadFile
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse
+from fastapi.staticfiles import StaticFiles
 
-app = Flask(__name__, static_folder="static", static_url_path="/static")
+app = FastAPI(title="MedLegal Upload Proxy")
+app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # Point this to your running FastAPI (change port if you used a different one)
 API_BASE = os.environ.get("MEDLEGAL_API_BASE", "http://127.0.0.1:8010")
 
-@app.route("/")
-def index():
-    return app.send_static_file("index.html")
+# One pooled async client for all upstream hops: connections stay alive
+# across the three calls per upload and across uploads, and the event
+# loop parks each in-flight upload on I/O instead of tying up a thread.
+CLIENT = httpx.AsyncClient(
+    base_url=API_BASE,
+    limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+    transport=httpx.AsyncHTTPTransport(retries=2),
+)
+
+# One parser instance, built once: extension registration is the pricey
+# part of markdown.markdown(); reset() makes it reusable across calls
+MD = markdown.Markdown(
+    extensions=["extra", "sane_lists", "tables", "nl2br"], output_format="html5"
+)
+
+@functools.lru_cache(maxsize=512)
+def _render_md(md_text: str) -> str:
+    """Markdown → HTML, memoized: retries and demo re-uploads often fetch
+    the same report bytes, and re-parsing is pure CPU."""
+    MD.reset()
+    return MD.convert(md_text)
+
+
+@app.get("/")
+async def index():
+    return FileResponse("static/index.html")
 
-@app.route("/upload", methods=["POST"])
-def upload_file():
+
+@app.post("/upload")
+async def upload_file(pdf: UploadFile = File(...), claim_id: str = Form(None)):
     """
     Accepts a single PDF and an optional claim_id.
     Proxies to FastAPI:
@@ -23,38 +52,35 @@ def upload_file():
       - /claims/{claim_id}/report.md
     Returns: HTML (converted from Markdown) to render in the page.
     """
-    if "pdf" not in request.files:
-        return jsonify({"error": "No PDF file found"}), 400
-
-    claim_id = request.form.get("claim_id") or "demo-claim-001"
-    pdf_file = request.files["pdf"]
+    claim_id = claim_id or "demo-claim-001"
 
-    if not pdf_file.filename.lower().endswith(".pdf"):
-        return jsonify({"error": "Please upload a .pdf file"}), 400
+    if not (pdf.filename or "").lower().endswith(".pdf"):
+        return JSONResponse({"error": "Please upload a .pdf file"}, status_code=400)
 
     try:
-        # 1) Ingest
-        ingest_url = f"{API_BASE}/claims/{claim_id}/ingest"
-        files = {"files": (pdf_file.filename, pdf_file.stream, "application/pdf")}
-        r = requests.post(ingest_url, files=files, timeout=60)
+        # 1) Ingest: hand the spooled upload straight through. httpx sizes
+        # the part via seek/tell and streams it to the socket in chunks, so
+        # a large scan never gets buffered whole in this process.
+        await pdf.seek(0)
+        files = {"files": (pdf.filename, pdf.file, "application/pdf")}
+        r = await CLIENT.post(f"/claims/{claim_id}/ingest", files=files, timeout=60)
         r.raise_for_status()
 
         # 2) Adjudicate (split → classify → collect → case → severity → score → report)
-        adjudicate_url = f"{API_BASE}/claims/{claim_id}/adjudicate"
-        r = requests.post(adjudicate_url, params={"workers": 6, "build_index": True}, timeout=600)
+        r = await CLIENT.post(
+            f"/claims/{claim_id}/adjudicate",
+            params={"workers": 6, "build_index": True},
+            timeout=600,
+        )
         r.raise_for_status()
 
         # 3) Fetch the Markdown report
-        report_url = f"{API_BASE}/claims/{claim_id}/report.md"
-        r = requests.get(report_url, timeout=60)
+        r = await CLIENT.get(f"/claims/{claim_id}/report.md", timeout=60)
         r.raise_for_status()
         md_text = r.text
 
         # Convert Markdown → HTML (lightweight)
-        html = markdown.markdown(
-            md_text,
-            extensions=["extra", "sane_lists", "tables", "nl2br"]
-        )
+        html = _render_md(md_text)
 
         # Wrap in a simple container so we can style it on the client
         wrapped = f"""
@@ -63,15 +89,17 @@ def upload_file():
         </div>
         """
 
-        return Response(wrapped, mimetype="text/html")
+        return HTMLResponse(wrapped)
 
-    except requests.HTTPError as e:
-        return jsonify({"error": f"Upstream API error: {e.response.text}"}), 500
-    except requests.RequestException as e:
-        return jsonify({"error": f"Could not reach API at {API_BASE}: {e}"}), 502
+    except httpx.HTTPStatusError as e:
+        return JSONResponse({"error": f"Upstream API error: {e.response.text}"}, status_code=500)
+    except httpx.RequestError as e:
+        return JSONResponse({"error": f"Could not reach API at {API_BASE}: {e}"}, status_code=502)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return JSONResponse({"error": str(e)}, status_code=500)
+
 
 if __name__ == "__main__":
-    # Flask dev server; change host/port as you like
-    app.run(host="127.0.0.1", port=5000, debug=True)
+    # scale out with `uvicorn server:app --workers N`; this keeps `python server.py` working
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=5000)
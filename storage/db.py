@@ -1,85 +1,156 @@
 # medlegal/storage/db.py
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-import json, pandas as pd
+import json, shutil, pandas as pd
 from typing import Iterable
+from google.cloud import documentai
 from google.cloud.documentai_toolbox import document as toolbox_doc
 from config import paths_for_claim
+from utils.io import loads_json, read_json_bytes
 
-def _load_doc(path: Path) -> dict:
-    return json.loads(path.read_text(encoding="utf-8"))
+try:
+    import orjson  # optional, same pattern as utils.io
+except ImportError:  # pragma: no cover
+    orjson = None
 
-def _anchor_text(doc: dict, anchor: dict|None) -> str:
-    if not anchor: return ""
-    segs = anchor.get("textSegments", [])
-    if not segs: return ""
-    s = int(segs[0].get("startIndex", 0)); e = int(segs[0].get("endIndex", 0))
-    return (doc.get("text") or "")[s:e]
+def _load_doc(path: Path) -> dict:
+    # bytes -> orjson (no str decode); transparently handles .json.zst
+    return loads_json(read_json_bytes(path))
 
+# Column-wise accumulation: handing pandas a dict of lists allocates the
+# arrays directly instead of reflecting over per-row dicts.
 def formfields_to_df(doc: dict, doc_id: str) -> pd.DataFrame:
-    rows=[]
+    pages=[]; keys=[]; vals=[]
+    text = doc.get("text") or ""
+
+    # Anchor resolution inlined: two calls plus a coalescing chain per
+    # field adds up over thousands of anchors, and empty/degenerate
+    # segments short-circuit before any slice
+    def _anchored(part: dict|None) -> str:
+        segs = (part or {}).get("textAnchor", {}).get("textSegments") or []
+        if not segs: return ""
+        seg = segs[0]
+        a = int(seg.get("startIndex") or 0); b = int(seg.get("endIndex") or 0)
+        return text[a:b] if b > a else ""
+
     for page_i, page in enumerate(doc.get("pages", []), start=1):
         for ff in page.get("formFields", []):
-            key = _anchor_text(doc, ff.get("fieldName",{}).get("textAnchor"))
-            val = _anchor_text(doc, ff.get("fieldValue",{}).get("textAnchor"))
-            rows.append({"doc_id": doc_id, "page": page_i, "key": key, "value": val})
-    return pd.DataFrame(rows)
+            pages.append(page_i)
+            keys.append(_anchored(ff.get("fieldName")))
+            vals.append(_anchored(ff.get("fieldValue")))
+    if not pages:
+        return pd.DataFrame()
+    # Arrow-backed strings skip per-cell Python objects; doc_id repeats, so
+    # parquet dictionary-encodes it to a few bytes per row on write
+    return pd.DataFrame({"doc_id": doc_id, "page": pages, "key": keys, "value": vals}) \
+        .astype({"doc_id": "string[pyarrow]", "key": "string[pyarrow]", "value": "string[pyarrow]"})
 
 def entities_to_df(doc: dict, doc_id: str) -> pd.DataFrame:
-    rows=[]
-    for ent in doc.get("entities", []):
-        rows.append({
-          "doc_id": doc_id,
-          "type": ent.get("type"),
-          "mentionText": ent.get("mentionText"),
-          "normalized": ent.get("normalizedValue"),
-          "confidence": ent.get("confidence"),
-        })
-    return pd.DataFrame(rows)
-
-def tables_to_csvs(document_json_path: Path, out_dir: Path) -> list[Path]:
-    """Export tables via Toolbox to CSV; returns list of CSV paths."""
+    ents = doc.get("entities", [])
+    if not ents:
+        return pd.DataFrame()
+    return pd.DataFrame({
+      "doc_id": doc_id,
+      "type": [e.get("type") for e in ents],
+      "mentionText": [e.get("mentionText") for e in ents],
+      "normalized": [e.get("normalizedValue") for e in ents],
+      "confidence": [e.get("confidence") for e in ents],
+    }).astype({"doc_id": "string[pyarrow]", "type": "string[pyarrow]",
+               "mentionText": "string[pyarrow]"})
+
+def tables_to_csvs(doc: dict, stem: str, out_dir: Path) -> list[Path]:
+    """Export tables via Toolbox to CSV; returns list of CSV paths.
+
+    Takes the already-parsed doc so the caller's parse is the only one;
+    from_document_path would re-read and re-decode the JSON from disk.
+    """
     out_dir.mkdir(parents=True, exist_ok=True)
-    wrapped = toolbox_doc.Document.from_document_path(document_path=str(document_json_path))
+    payload = orjson.dumps(doc) if orjson is not None \
+        else json.dumps(doc, ensure_ascii=False)
+    wrapped = toolbox_doc.Document.from_documentai_document(
+        documentai.Document.from_json(payload)
+    )
     csvs=[]
     for page in wrapped.pages:
         for idx, t in enumerate(page.tables):
             df = t.to_dataframe()
-            base = out_dir / f"{document_json_path.stem}_p{page.page_number}_t{idx}"
+            base = out_dir / f"{stem}_p{page.page_number}_t{idx}"
             df.to_csv(base.with_suffix(".csv"), index=False)
             csvs.append(base.with_suffix(".csv"))
     return csvs
 
 def text_chunks(doc: dict, doc_id: str, max_chars=3500, overlap=350) -> Iterable[dict]:
     text = doc.get("text") or ""
-    i=0; n=len(text)
+    # offsets first, slices after: keeps the window scan allocation-free
+    breaks=[]; i=0; n=len(text)
     while i<n:
-        s=i; e=min(i+max_chars, n)
-        yield {"doc_id": doc_id, "text_start": s, "text_end": e, "text": text[s:e]}
+        e=min(i+max_chars, n)
+        breaks.append((i, e))
         i = e - overlap
+    for s, e in breaks:
+        yield {"doc_id": doc_id, "text_start": s, "text_end": e, "text": text[s:e]}
+
+# Below this many docs, pool spin-up costs more than it saves (same gate
+# as preprocess.normalize)
+_POOL_MIN_FILES = 16
+
+def _normalize_one(f: Path, tables_dir: Path, chunks_dir: Path,
+                   forms_dir: Path, ents_dir: Path) -> None:
+    """Normalize one DocAI JSON: CSVs, chunk JSONL, and parquet fragments.
+
+    Top-level so ProcessPoolExecutor can pickle it; each doc is an
+    independent parse + DataFrame build, so the pool scales with cores.
+    Form/entity rows land as one parquet fragment per doc - peak memory
+    stays at one document's rows and nothing travels back over the pool.
+    """
+    doc = _load_doc(f); doc_id = f.name.removesuffix(".zst").removesuffix(".json")
+    df_form = formfields_to_df(doc, doc_id)
+    if not df_form.empty:
+        df_form.to_parquet(forms_dir / f"{doc_id}.parquet",
+                           engine="pyarrow", compression="zstd", compression_level=3)
+    df_ent = entities_to_df(doc, doc_id)
+    if not df_ent.empty:
+        df_ent.to_parquet(ents_dir / f"{doc_id}.parquet",
+                          engine="pyarrow", compression="zstd", compression_level=3)
+
+    # export tables for form docs (parsed doc in hand, no second read)
+    if f.name.endswith((".form.json", ".form.json.zst")):
+        tables_to_csvs(doc, doc_id, tables_dir)
+
+    # write text chunks; orjson emits bytes, so skip the str round-trip
+    with open(chunks_dir / f"{doc_id}.jsonl", "wb") as w:
+        for ch in text_chunks(doc, doc_id):
+            if orjson is not None:
+                w.write(orjson.dumps(ch))
+            else:
+                w.write(json.dumps(ch, ensure_ascii=False).encode("utf-8"))
+            w.write(b"\n")
 
 def normalize_all(claim_id: str) -> None:
     p = paths_for_claim(claim_id)
-    p.pandas_out.mkdir(parents=True, exist_ok=True)
     p.chunks_text.mkdir(parents=True, exist_ok=True)
 
-    all_forms=[]; all_ents=[]
-    for f in sorted(p.docai_json.glob("*.json")):
-        doc = _load_doc(f); doc_id = f.stem
-        df_form = formfields_to_df(doc, doc_id)
-        if not df_form.empty: all_forms.append(df_form)
-        df_ent = entities_to_df(doc, doc_id)
-        if not df_ent.empty: all_ents.append(df_ent)
-
-        # export tables for form docs
-        if f.name.endswith(".form.json"):
-            tables_to_csvs(f, p.artifacts_tables)
-
-        # write text chunks
-        with open(p.chunks_text / f"{doc_id}.jsonl", "w", encoding="utf-8") as w:
-            for ch in text_chunks(doc, doc_id):
-                w.write(json.dumps(ch, ensure_ascii=False) + "\n")
-
-    if all_forms:
-        pd.concat(all_forms, ignore_index=True).to_parquet(p.pandas_out / "form_fields.parquet")
-    if all_ents:
-        pd.concat(all_ents, ignore_index=True).to_parquet(p.pandas_out / "entities.parquet")
+    # Parquet datasets, one fragment per doc: concat-then-write peaked at
+    # twice the combined frames. Readers open the directory as a dataset
+    # (pd.read_parquet / pyarrow.dataset on the dir). Reset so fragments
+    # from docs deleted since the last run don't linger.
+    forms_dir = p.pandas_out / "form_fields"
+    ents_dir = p.pandas_out / "entities"
+    for d in (forms_dir, ents_dir):
+        shutil.rmtree(d, ignore_errors=True)
+        d.mkdir(parents=True, exist_ok=True)
+
+    files = sorted([*p.docai_json.glob("*.json"), *p.docai_json.glob("*.json.zst")])
+    if len(files) >= _POOL_MIN_FILES:
+        # Each doc holds the GIL through JSON parse + pandas work, so
+        # processes, not threads; all outputs go straight to disk.
+        n = len(files)
+        with ProcessPoolExecutor() as ex:
+            list(ex.map(
+                _normalize_one, files,
+                [p.artifacts_tables] * n, [p.chunks_text] * n,
+                [forms_dir] * n, [ents_dir] * n,
+            ))
+    else:
+        for f in files:
+            _normalize_one(f, p.artifacts_tables, p.chunks_text, forms_dir, ents_dir)
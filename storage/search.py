@@ -1,10 +1,22 @@
 # medlegal/storage/search.py
 from __future__ import annotations
+from functools import lru_cache
 from pathlib import Path
 import sqlite3
 from typing import List, Dict, Any
 from config import paths_for_claim
 
+@lru_cache(maxsize=64)
+def _conn(db_path: str, mtime_ns: int) -> sqlite3.Connection:
+    # One read-only connection per (db, build): opening involves WAL setup
+    # and pragma churn we don't want per search. mtime_ns keys the cache so
+    # a rebuilt index (the builder unlinks the file) gets a fresh handle.
+    con = sqlite3.connect(db_path, check_same_thread=False)
+    con.row_factory = sqlite3.Row
+    con.execute("PRAGMA query_only=ON")
+    con.execute("PRAGMA mmap_size=268435456")
+    return con
+
 def search_chunks(claim_id: str, query: str, k: int = 10) -> List[Dict[str,Any]]:
     p = paths_for_claim(claim_id)
     claim_root = p.docai_json.parent.parent
@@ -12,29 +24,28 @@ def search_chunks(claim_id: str, query: str, k: int = 10) -> List[Dict[str,Any]]
     if not db_path.exists():
         raise FileNotFoundError(f"{db_path} not found; build index first.")
 
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
+    con = _conn(str(db_path), db_path.stat().st_mtime_ns)
     # FTS5 rank using bm25()
+    # chunks_fts is external-content over chunks, so its rowids are the
+    # chunks rowids by construction
     sql = """
     SELECT c.chunk_id, c.category, c.page, c.citation, c.filename,
-           snippets(chunks_fts, 1, '[', ']', ' … ', 12) AS snippet,
+           snippet(chunks_fts, 0, '[', ']', ' … ', 12) AS snippet,
            bm25(chunks_fts) AS rank
     FROM chunks_fts
-    JOIN chunks c ON c.chunk_id = chunks_fts.chunk_id
+    JOIN chunks c ON c.rowid = chunks_fts.rowid
     WHERE chunks_fts MATCH ?
     ORDER BY rank LIMIT ?
     """
-    cur.execute(sql, (query, k))
     out = []
-    for row in cur.fetchall():
+    for row in con.execute(sql, (query, k)).fetchall():
         out.append({
-            "chunk_id": row[0],
-            "category": row[1],
-            "page": row[2],
-            "citation": row[3],
-            "filename": row[4],
-            "snippet": row[5],
-            "rank": row[6],
+            "chunk_id": row["chunk_id"],
+            "category": row["category"],
+            "page": row["page"],
+            "citation": row["citation"],
+            "filename": row["filename"],
+            "snippet": row["snippet"],
+            "rank": row["rank"],
         })
-    con.close()
     return out
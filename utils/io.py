@@ -1,16 +1,85 @@
 # medlegal/utils/io.py
 from pathlib import Path
 import json
+import os
 
-def write_json_utf8(path: Path, obj, pretty: bool = True) -> None:
+try:
+    import orjson  # 3-10x faster than stdlib json; optional
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import zstandard  # transparently compresses big JSON sidecars; optional
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+# below this, compression overhead beats the bytes saved
+ZSTD_MIN_BYTES = 4096
+
+def loads_json(s):
+    """Parse a JSON str/bytes with orjson when available."""
+    if orjson is not None:
+        return orjson.loads(s)
+    return json.loads(s)
+
+def read_json_utf8(path: Path):
+    if orjson is not None:
+        return orjson.loads(Path(path).read_bytes())
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_bytes_atomic(path: Path, data: bytes) -> None:
+    # tmp-then-rename: readers (and crashed re-runs) never see a partial
+    # file, and one write_bytes of the encoded blob is a single syscall
     path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        if pretty:
-            json.dump(obj, f, ensure_ascii=False, indent=2)
-        else:
-            json.dump(obj, f, ensure_ascii=False)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+def write_json_utf8(path: Path, obj, pretty: bool = True) -> None:
+    path = Path(path)
+    if orjson is not None:
+        opt = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        data = orjson.dumps(obj, option=opt)
+    elif pretty:
+        data = json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    else:
+        data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+    _write_bytes_atomic(path, data)
 
 def write_text_utf8(path: Path, text: str) -> None:
+    _write_bytes_atomic(Path(path), text.encode("utf-8"))
+
+def write_json_maybe_zstd(path: Path, data: bytes) -> Path:
+    """Write JSON bytes to `path`, or zstd-compressed to `<path>.zst` when it pays.
+
+    Returns the path actually written and removes the stale twin so only
+    one variant of a sidecar survives a re-run.
+    """
+    path = Path(path)
     path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(text)
+    zpath = path.with_name(path.name + ".zst")
+    if zstandard is not None and len(data) >= ZSTD_MIN_BYTES:
+        zpath.write_bytes(zstandard.ZstdCompressor(level=3).compress(data))
+        path.unlink(missing_ok=True)
+        return zpath
+    path.write_bytes(data)
+    zpath.unlink(missing_ok=True)
+    return path
+
+def existing_json(path: Path):
+    """Resolve a sidecar path to whichever variant is on disk (.json or .json.zst)."""
+    path = Path(path)
+    if path.exists():
+        return path
+    zpath = path.with_name(path.name + ".zst")
+    return zpath if zpath.exists() else None
+
+def read_json_bytes(path: Path) -> bytes:
+    """Raw JSON bytes from a sidecar, decompressing .zst transparently."""
+    data = Path(path).read_bytes()
+    if Path(path).name.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{path} is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
@@ -0,0 +1,43 @@
+# medlegal/utils/llm_cache.py
+# Content-addressed cache for Gemini responses. Keys are SHA-256 over the
+# full prompt material, so any dossier/prompt edit naturally misses.
+# Opt-in via MEDLEGAL_LLM_CACHE=1 (off by default to keep runs fresh).
+from __future__ import annotations
+from pathlib import Path
+from typing import Optional
+import hashlib, os
+
+from config import paths_for_claim
+
+def enabled() -> bool:
+    return os.environ.get("MEDLEGAL_LLM_CACHE", "0") == "1"
+
+def cache_key(*parts: str | bytes) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8", errors="ignore")
+        h.update(part)
+    return h.hexdigest()
+
+def _cache_dir(claim_id: str) -> Path:
+    p = paths_for_claim(claim_id).processed_root / "llm_cache"
+    p.mkdir(parents=True, exist_ok=True)
+    return p
+
+def get(claim_id: str, key: str) -> Optional[str]:
+    if not enabled():
+        return None
+    f = _cache_dir(claim_id) / f"{key}.json"
+    try:
+        return f.read_text(encoding="utf-8") if f.exists() else None
+    except Exception:
+        return None
+
+def put(claim_id: str, key: str, text: str) -> None:
+    if not enabled():
+        return
+    try:
+        (_cache_dir(claim_id) / f"{key}.json").write_text(text, encoding="utf-8")
+    except Exception:
+        pass